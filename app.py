@@ -3,6 +3,9 @@ from config import config
 from routes import auth_bp, main_bp, room_bp, booking_bp, location_bp
 from models.user import User
 from models.location import Location
+from models.booking import booking_reconciler
+from models.indexes import ensure_indexes
+from commands import register_commands
 import os
 
 def create_app(config_name=None):
@@ -20,8 +23,14 @@ def create_app(config_name=None):
     app.register_blueprint(booking_bp, url_prefix='/booking')
     app.register_blueprint(location_bp, url_prefix='/location')
     
+    register_commands(app)
+    
     # Initialize database and create admin user and hotel info
     with app.app_context():
+        index_report = ensure_indexes()
+        for error in index_report['errors']:
+            print(f"⚠️  Index creation failed: {error}")
+        
         user_model = User()
         admin_result = user_model.create_admin_user()
         if admin_result and admin_result.get('success'):
@@ -34,7 +43,12 @@ def create_app(config_name=None):
         hotel_info = location_model.get_hotel_info()
         if hotel_info:
             print("✅ Hotel information initialized")
-        location_model.close_connection()
+    
+    # Started from the first request of each process rather than here, so
+    # every pre-fork worker runs its own loop (and CLI commands run none)
+    @app.before_request
+    def start_booking_reconciler():
+        booking_reconciler.start(app.config['BOOKING_RECONCILE_INTERVAL'])
     
     return app
 
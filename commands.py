@@ -0,0 +1,199 @@
+import click
+from bson.objectid import ObjectId
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+from datetime import datetime, timedelta
+import os
+import time
+from models.user import User, password_hasher
+from models.room import Room
+from models.booking import Booking, booking_reconciler
+from models.location import Location, WIDE_SEARCH_RADIUS
+from models.place import Place
+from models.indexes import ensure_indexes, explain_hot_queries
+
+
+def register_commands(app):
+    """Register maintenance and diagnostic commands on the Flask CLI"""
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Create every index declared in the model INDEXES registries"""
+        report = ensure_indexes()
+        for name in report['created']:
+            click.echo(f"ok     {name}")
+        for error in report['errors']:
+            click.echo(f"error  {error}")
+        if report['errors']:
+            raise click.ClickException('Some indexes could not be created')
+
+    @app.cli.command('check-indexes')
+    def check_indexes():
+        """Explain every hot query and report the ones not using an index"""
+        results = explain_hot_queries()
+        for result in results:
+            status = 'index' if result['uses_index'] else 'SCAN '
+            detail = result.get('error') or ' > '.join(result['stages'])
+            click.echo(f"{status}  {result['query']:<38} {result['collection']:<12} {detail}")
+        unindexed = [r['query'] for r in results if not r['uses_index']]
+        if unindexed:
+            raise click.ClickException(f"{len(unindexed)} hot queries are not using an index: {', '.join(unindexed)}")
+        click.echo(f"All {len(results)} hot queries use an index")
+
+    @app.cli.command('backfill-night-claims')
+    def backfill_night_claims():
+        """Create night claims for active bookings made before they existed"""
+        result = Booking().backfill_night_claims()
+        click.echo(f"Claimed nights for {result['claimed']} bookings")
+        for booking_id in result['conflicts']:
+            click.echo(f"Conflict: booking {booking_id} overlaps an existing claim")
+
+    @app.cli.command('reconcile-bookings')
+    def reconcile_bookings():
+        """Re-sync the room and user snapshots embedded in every booking"""
+        report = booking_reconciler.reconcile_all()
+        click.echo(f"Updated {report['rooms']} room snapshots and {report['users']} user summaries")
+
+    @app.cli.command('rebuild-booking-stats')
+    def rebuild_booking_stats():
+        """Recompute the dashboard booking counters from scratch"""
+        result = Booking().rebuild_booking_stats()
+        if not result['success']:
+            raise click.ClickException(result['message'])
+        click.echo(f"Booking counters rebuilt: {result['stats']}")
+
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=1000, show_default=True, help='Users per insert_many')
+    @click.option('--workers', default=None, type=int, help='Hashing threads [default: AUTH_HASH_WORKERS]')
+    @click.option('--hash-method', default=None, help='Werkzeug hash method for imported passwords; upgraded on first login')
+    @click.option('--allow-admin', is_flag=True, help='Accept rows with the admin role (rejected by default)')
+    def import_users(path, batch_size, workers, hash_method, allow_admin):
+        """Import guest accounts from a CSV (name,email,password[,role]) or JSON lines file"""
+        def read_records():
+            with open(path, newline='') as f:
+                if path.endswith('.csv'):
+                    yield from csv.DictReader(f)
+                else:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+
+        def progress(report):
+            click.echo(f"processed {report['processed']:>7}  inserted {report['inserted']:>7}  "
+                       f"duplicates {report['duplicates']:>5}  errors {len(report['errors']):>5}")
+
+        started = time.perf_counter()
+        report = User().import_users(read_records(), batch_size=batch_size, workers=workers,
+                                     hash_method=hash_method, on_progress=progress, allow_admin=allow_admin)
+        for error in report['errors']:
+            click.echo(f"row {error['row']}: {error['email']}: {error['message']}")
+        click.echo(f"Imported {report['inserted']} users in {time.perf_counter() - started:.1f}s")
+
+    @app.cli.command('import-places')
+    @click.argument('path', required=False, type=click.Path(exists=True, dir_okay=False))
+    @click.option('--fetch', is_flag=True, help='Fetch every place type from Google around the hotel')
+    @click.option('--mock', is_flag=True, help='Load the built-in sample places')
+    def import_places(path, fetch, mock):
+        """Fill the local places store from a JSON file, Google, or sample data.
+
+        The file holds a list of places, each with place_type, name, address
+        and coordinates {lat, lng}.
+        """
+        place_store = Place()
+        location_model = Location()
+        place_types = ['tourist_attraction', 'restaurant', 'shopping_mall']
+        batches = {}
+
+        if path:
+            with open(path) as f:
+                for place in json.load(f):
+                    batches.setdefault((place['place_type'], 'import'), []).append(place)
+        if mock:
+            for place_type in place_types:
+                batches[(place_type, 'mock')] = location_model._get_mock_places(place_type)
+        if fetch:
+            hotel_info = location_model.get_hotel_info()
+            if not hotel_info or 'coordinates' not in hotel_info:
+                raise click.ClickException('Hotel coordinates are required to fetch places')
+            for place_type in place_types:
+                # Fetched results are stored as a side effect
+                places = location_model._fetch_nearby_places(place_type, WIDE_SEARCH_RADIUS, hotel_info['coordinates'])
+                click.echo(f"fetched  {place_type:<20} {len(places) if places is not None else 'failed'}")
+        if not (path or mock or fetch):
+            raise click.ClickException('Give a JSON file, --fetch or --mock')
+
+        for (place_type, source), places in batches.items():
+            written = place_store.upsert_places(place_type, places, source=source)
+            click.echo(f"stored   {place_type:<20} {written} ({source})")
+
+    @app.cli.command('bench-login')
+    @click.option('--logins', default=200, show_default=True, help='Total successful logins to perform')
+    @click.option('--threads', default=os.cpu_count() or 2, show_default=True, help='Concurrent login threads')
+    def bench_login(logins, threads):
+        """Measure end-to-end logins/sec (throttling off) with the configured hash method"""
+        user_model = User()
+        email = f"bench-{ObjectId()}@example.com"
+        password = 'bench-password'
+        created = user_model.create_user('Login Benchmark', email, password)
+        if not created['success']:
+            raise click.ClickException(created['message'])
+
+        def attempt(_):
+            return User().authenticate_user(email, password, throttle=False)['success']
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(attempt, range(logins)))
+            elapsed = time.perf_counter() - started
+        finally:
+            user_model.collection.delete_one({'_id': ObjectId(created['user_id'])})
+
+        cores = min(threads, password_hasher.workers, os.cpu_count() or 1)
+        rate = logins / elapsed
+        click.echo(f"method {password_hasher.method}, {threads} threads, {cores} hashing cores")
+        click.echo(f"{logins} logins in {elapsed:.2f}s: {rate:.1f} logins/sec, {rate / cores:.1f} per core")
+        if not all(results):
+            raise click.ClickException(f"{results.count(False)} logins failed")
+
+    @app.cli.command('stress-booking')
+    @click.option('--threads', default=32, show_default=True, help='Concurrent booking attempts')
+    @click.option('--days-ahead', default=400, show_default=True, help='Check-in offset from today')
+    @click.option('--nights', default=3, show_default=True, help='Length of the contested stay')
+    def stress_booking(threads, days_ahead, nights):
+        """Hammer one room from many threads; exactly one booking must win"""
+        room_model = Room()
+        booking_model = Booking()
+        user = User().collection.find_one({'role': 'admin'})
+        if not user:
+            raise click.ClickException('Admin user is required; start the app once to create it')
+
+        room = room_model.create_room('Stress Test Room', 'Temporary room for stress-booking', 1, 1)
+        if not room['success']:
+            raise click.ClickException(room['message'])
+
+        check_in = datetime.now().date() + timedelta(days=days_ahead)
+        check_out = check_in + timedelta(days=nights)
+
+        def attempt(_):
+            # Each thread gets its own model, as separate requests would
+            return Booking().create_booking(str(user['_id']), room['room_id'], check_in, check_out, nights)
+
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                results = list(pool.map(attempt, range(threads)))
+        finally:
+            # Remove everything the run created
+            booking_model.night_claims.delete_many({'room_id': ObjectId(room['room_id'])})
+            booking_model.collection.delete_many({'room_id': ObjectId(room['room_id'])})
+            booking_model.availability.invalidate(room['room_id'])
+            room_model.delete_room(room['room_id'])
+            booking_model.rebuild_booking_stats()
+
+        won = sum(1 for r in results if r['success'])
+        click.echo(f"{threads} concurrent attempts, {won} succeeded, {threads - won} rejected")
+        if won != 1:
+            raise click.ClickException(f'Expected exactly one booking to succeed, got {won}')
@@ -7,6 +7,85 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     MONGO_URI = os.environ.get('MONGO_URI') or 'mongodb://localhost:27017/hotel_booking'
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY') or 'YOUR_API_KEY_HERE'
+    GOOGLE_PLACES_API_URL = os.environ.get('GOOGLE_PLACES_API_URL') or 'https://maps.googleapis.com/maps/api/place'
+    
+    # Password hashing: werkzeug method string including its cost; older hashes are
+    # upgraded on login. Hashing runs on AUTH_HASH_WORKERS threads with a bounded queue
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', os.cpu_count() or 2))
+    AUTH_HASH_QUEUE = int(os.environ.get('AUTH_HASH_QUEUE', 32))
+    
+    # Login throttling (token buckets): attempts per minute and burst size
+    LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', 20))
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 10))
+    LOGIN_EMAIL_PER_MINUTE = float(os.environ.get('LOGIN_EMAIL_PER_MINUTE', 5))
+    LOGIN_EMAIL_BURST = int(os.environ.get('LOGIN_EMAIL_BURST', 5))
+    
+    # Logged-in user's id/name/role, cached for authorization checks (seconds)
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+    
+    # Outbound Google Maps HTTP client (seconds / counts)
+    MAPS_CONNECT_TIMEOUT = float(os.environ.get('MAPS_CONNECT_TIMEOUT', 3))
+    MAPS_READ_TIMEOUT = float(os.environ.get('MAPS_READ_TIMEOUT', 8))
+    MAPS_MAX_RETRIES = int(os.environ.get('MAPS_MAX_RETRIES', 2))
+    MAPS_POOL_SIZE = int(os.environ.get('MAPS_POOL_SIZE', 10))
+    MAPS_BREAKER_THRESHOLD = int(os.environ.get('MAPS_BREAKER_THRESHOLD', 5))
+    MAPS_BREAKER_RESET = int(os.environ.get('MAPS_BREAKER_RESET', 30))
+    
+    # MongoDB connection pool (shared by all models, one client per process)
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 10000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    
+    # In-memory room availability index; entries are reloaded after this many seconds
+    AVAILABILITY_INDEX_ENABLED = os.environ.get('AVAILABILITY_INDEX_ENABLED', 'true').lower() == 'true'
+    AVAILABILITY_INDEX_TTL = int(os.environ.get('AVAILABILITY_INDEX_TTL', 30))
+    
+    # Per-room month calendars behind the batch availability API (seconds)
+    AVAILABILITY_CACHE_TTL = int(os.environ.get('AVAILABILITY_CACHE_TTL', 30))
+    
+    # Serve dashboard booking stats from an incrementally maintained counters document
+    BOOKING_STATS_COUNTERS = os.environ.get('BOOKING_STATS_COUNTERS', 'true').lower() == 'true'
+    # How often the counters are recomputed from the bookings to correct any drift (seconds)
+    BOOKING_STATS_RECONCILE_INTERVAL = int(os.environ.get('BOOKING_STATS_RECONCILE_INTERVAL', 3600))
+    
+    # Rendered admin booking-details modals (seconds)
+    BOOKING_MODAL_CACHE_TTL = int(os.environ.get('BOOKING_MODAL_CACHE_TTL', 900))
+    
+    # Full pass re-syncing room/user snapshots embedded in bookings, run by every web worker
+    # (seconds; 0 disables, e.g. to run `flask reconcile-bookings` from cron instead)
+    BOOKING_RECONCILE_INTERVAL = int(os.environ.get('BOOKING_RECONCILE_INTERVAL', 3600))
+    
+    # Active pricing rules; compiled rate tables follow the rules version and live this long too (seconds)
+    PRICING_RULES_CACHE_TTL = int(os.environ.get('PRICING_RULES_CACHE_TTL', 300))
+    
+    # Rendered public pages for anonymous visitors (seconds)
+    PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    
+    # Read-through caches: 'memory' (per process) or 'redis' (shared; needs the redis package)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    ROOM_CACHE_TTL = int(os.environ.get('ROOM_CACHE_TTL', 300))
+    
+    # Nearby places: fresh for PLACES_CACHE_TTL, then served stale while refreshing
+    PLACES_CACHE_TTL = int(os.environ.get('PLACES_CACHE_TTL', 6 * 3600))
+    PLACES_CACHE_MAX_STALE = int(os.environ.get('PLACES_CACHE_MAX_STALE', 7 * 24 * 3600))
+    
+    # Place details change rarely: cached server-side for PLACE_DETAILS_CACHE_TTL,
+    # and browsers may reuse place-details/photo responses for PLACE_DETAILS_MAX_AGE
+    PLACE_DETAILS_CACHE_TTL = int(os.environ.get('PLACE_DETAILS_CACHE_TTL', 6 * 3600))
+    PLACE_DETAILS_MAX_AGE = int(os.environ.get('PLACE_DETAILS_MAX_AGE', 3600))
+    
+    # Hotel info is cached per worker; other workers' edits show up via updated_at polling
+    # (or immediately via a change stream when running against a replica set)
+    HOTEL_INFO_POLL_INTERVAL = int(os.environ.get('HOTEL_INFO_POLL_INTERVAL', 30))
+    HOTEL_INFO_CHANGE_STREAM = os.environ.get('HOTEL_INFO_CHANGE_STREAM', 'false').lower() == 'true'
     
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -1,4 +1,5 @@
-from .user import User, Database
+from .database import Database
+from .user import User
 from .room import Room
 from .booking import Booking
 
@@ -0,0 +1,75 @@
+import threading
+
+
+class AmenityFacetIndex:
+    """Amenity -> room id sets for the available rooms.
+
+    Filtering is set union (``match='any'``) or intersection (``'all'``), and
+    facet counts are intersections with the current result set. The index
+    records the room catalog version it was built from; local room writes
+    patch it in place, and a version bump from another worker triggers a
+    rebuild.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._rooms = {}
+        self._by_amenity = {}
+        self._lock = threading.Lock()
+
+    def rebuild(self, rooms, version):
+        by_amenity, room_amenities = {}, {}
+        for room in rooms:
+            amenities = frozenset(room.get('amenities', []))
+            room_amenities[room['_id']] = amenities
+            for amenity in amenities:
+                by_amenity.setdefault(amenity, set()).add(room['_id'])
+        with self._lock:
+            self._rooms = room_amenities
+            self._by_amenity = by_amenity
+            self.version = version
+
+    def is_current(self, version):
+        return self.version == version
+
+    def apply(self, room_id, amenities, available, previous_version, version):
+        """Patch one room after a local write; returns False if a rebuild is needed"""
+        with self._lock:
+            if self.version != previous_version:
+                return False
+            self._discard(room_id)
+            if available:
+                amenities = frozenset(amenities or [])
+                self._rooms[room_id] = amenities
+                for amenity in amenities:
+                    self._by_amenity.setdefault(amenity, set()).add(room_id)
+            self.version = version
+            return True
+
+    def _discard(self, room_id):
+        for amenity in self._rooms.pop(room_id, ()):
+            room_ids = self._by_amenity.get(amenity)
+            if room_ids is not None:
+                room_ids.discard(room_id)
+                if not room_ids:
+                    del self._by_amenity[amenity]
+
+    def filter(self, amenities, match='any'):
+        """Room ids having any (or all) of the given amenities"""
+        with self._lock:
+            sets = [self._by_amenity.get(amenity, set()) for amenity in amenities]
+        if not sets:
+            return set(self._rooms)
+        if match == 'all':
+            return set.intersection(*sets)
+        return set.union(*sets)
+
+    def facets(self, room_ids=None):
+        """Sorted (amenity, count) pairs, counted within room_ids if given"""
+        with self._lock:
+            if room_ids is None:
+                counts = {amenity: len(ids) for amenity, ids in self._by_amenity.items()}
+            else:
+                room_ids = set(room_ids)
+                counts = {amenity: len(ids & room_ids) for amenity, ids in self._by_amenity.items()}
+        return sorted(counts.items())
@@ -0,0 +1,260 @@
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime
+import base64
+import threading
+import time
+
+# Booking statuses that hold a room
+ACTIVE_STATUSES = ['pending', 'confirmed']
+
+# Occupancy calendars run from today to the start of the month this many months ahead
+OCCUPANCY_HORIZON_MONTHS = 18
+
+
+def to_datetime(value):
+    """Convert a date or datetime to a midnight-aligned datetime for MongoDB"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.combine(value, datetime.min.time())
+
+
+def to_ordinal(value):
+    """Convert a date or datetime to a day ordinal"""
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.toordinal()
+
+
+def month_of(ordinal):
+    """'YYYY-MM' of a day ordinal"""
+    return date.fromordinal(ordinal).strftime('%Y-%m')
+
+
+def month_range(month):
+    """(first day ordinal, first day ordinal of the next month) for 'YYYY-MM'"""
+    start = datetime.strptime(month, '%Y-%m').date()
+    following = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start.toordinal(), following.toordinal()
+
+
+def months_ahead(ordinal, months):
+    """Day ordinal of the 1st of the month ``months`` after the month of ordinal"""
+    day = date.fromordinal(ordinal)
+    years, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + years, month + 1, 1).toordinal()
+
+
+def pack_nights(nights):
+    """One bit per night (set when booked), least significant bit first"""
+    packed = bytearray((len(nights) + 7) // 8)
+    for night, count in enumerate(nights):
+        if count:
+            packed[night >> 3] |= 1 << (night & 7)
+    return base64.b64encode(bytes(packed)).decode('ascii')
+
+
+def run_lengths(nights):
+    """Alternating free/booked run lengths, always starting with a (possibly empty) free run"""
+    runs, booked, length = [], False, 0
+    for count in nights:
+        if bool(count) != booked:
+            runs.append(length)
+            booked, length = not booked, 0
+        length += 1
+    runs.append(length)
+    return runs
+
+
+def months_between(check_in, check_out):
+    """'YYYY-MM' of every night in [check_in, check_out)"""
+    return sorted({month_of(night) for night in range(to_ordinal(check_in), to_ordinal(check_out))})
+
+
+def overlap_filter(check_in, check_out):
+    """MongoDB filter matching stays that overlap [check_in, check_out).
+
+    Two half-open stays overlap exactly when each one starts before the
+    other one ends, which covers every case the old three-branch $or did.
+    """
+    return {
+        'check_in': {'$lt': to_datetime(check_out)},
+        'check_out': {'$gt': to_datetime(check_in)}
+    }
+
+
+class RoomIntervals:
+    """Active stays for one room, sorted by check-in day.
+
+    ``max_ends[i]`` is the latest check-out among the first ``i + 1`` stays, so an
+    overlap query is one bisect plus one comparison even if legacy data
+    contains overlapping stays.
+
+    ``nights`` counts the stays holding each night from ``origin`` (the day
+    the room was loaded) to the end of the occupancy horizon; counts rather
+    than flags keep a night booked when one of two overlapping legacy stays
+    is removed.
+    """
+
+    def __init__(self, intervals=None):
+        self.starts = []
+        self.ends = []
+        self.booking_ids = []
+        self.max_ends = []
+        self.loaded_at = time.monotonic()
+        self.origin = date.today().toordinal()
+        self.nights = array('B', bytes(months_ahead(self.origin, OCCUPANCY_HORIZON_MONTHS) - self.origin))
+        for booking_id, start, end in intervals or []:
+            self._insert(booking_id, start, end)
+        self._rebuild_max_ends()
+
+    def _insert(self, booking_id, start, end):
+        position = bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.booking_ids.insert(position, booking_id)
+        self._mark(start, end, 1)
+
+    def _mark(self, start, end, step):
+        for night in range(max(start - self.origin, 0), min(end - self.origin, len(self.nights))):
+            self.nights[night] += step
+
+    def _rebuild_max_ends(self):
+        self.max_ends = []
+        latest = None
+        for end in self.ends:
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+
+    def add(self, booking_id, start, end):
+        self._discard(booking_id)
+        self._insert(booking_id, start, end)
+        self._rebuild_max_ends()
+
+    def remove(self, booking_id):
+        if self._discard(booking_id):
+            self._rebuild_max_ends()
+
+    def _discard(self, booking_id):
+        if booking_id not in self.booking_ids:
+            return False
+        position = self.booking_ids.index(booking_id)
+        self._mark(self.starts[position], self.ends[position], -1)
+        del self.starts[position]
+        del self.ends[position]
+        del self.booking_ids[position]
+        return True
+
+    def is_free(self, start, end):
+        # Stays starting before the requested check-out are candidates
+        position = bisect_left(self.starts, end)
+        return position == 0 or self.max_ends[position - 1] <= start
+
+    def intervals(self):
+        return list(zip(self.booking_ids, self.starts, self.ends))
+
+
+class AvailabilityIndex:
+    """In-process index of active bookings per room.
+
+    Rooms are loaded lazily through ``loader(room_id)``, which returns
+    ``(booking_id, check_in, check_out)`` tuples, and reloaded after ``ttl``
+    seconds so writes made by other worker processes are picked up. Writes in
+    this process update the index immediately; writes made while a room is
+    loading are replayed onto the loaded intervals before they are installed.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._rooms = {}
+        # room_id -> one list of writes per load in flight
+        self._loading = {}
+        self._lock = threading.RLock()
+
+    def _get_room(self, room_id, loader):
+        room_id = str(room_id)
+        with self._lock:
+            room = self._rooms.get(room_id)
+            # A room loaded on an earlier day has a stale occupancy horizon
+            if (room is not None and time.monotonic() - room.loaded_at < self.ttl
+                    and room.origin == date.today().toordinal()):
+                return room
+            writes = []
+            self._loading.setdefault(room_id, []).append(writes)
+
+        # Load outside the lock so a slow query does not block other rooms
+        try:
+            intervals = [
+                (str(booking_id), to_ordinal(check_in), to_ordinal(check_out))
+                for booking_id, check_in, check_out in loader(room_id)
+            ]
+            room = RoomIntervals(intervals)
+        except Exception:
+            with self._lock:
+                self._end_load(room_id, writes)
+            raise
+
+        with self._lock:
+            self._end_load(room_id, writes)
+            # The query may or may not have seen these; add and remove are idempotent
+            for write in writes:
+                if write is None:
+                    # Invalidated mid-load: answer this call, but don't keep the result
+                    return room
+                action, args = write
+                getattr(room, action)(*args)
+            self._rooms[room_id] = room
+        return room
+
+    def _end_load(self, room_id, writes):
+        loads = [load for load in self._loading[room_id] if load is not writes]
+        if loads:
+            self._loading[room_id] = loads
+        else:
+            del self._loading[room_id]
+
+    def _record_write(self, room_id, write):
+        for writes in self._loading.get(room_id, ()):
+            writes.append(write)
+
+    def is_available(self, room_id, check_in, check_out, loader):
+        start, end = to_ordinal(check_in), to_ordinal(check_out)
+        room = self._get_room(room_id, loader)
+        with self._lock:
+            return room.is_free(start, end)
+
+    def booked_intervals(self, room_id, loader):
+        room = self._get_room(room_id, loader)
+        with self._lock:
+            return room.intervals()
+
+    def occupancy(self, room_id, loader, days=None):
+        """(first night ordinal, copy of the per-night stay counts) for the coming ``days`` nights"""
+        room = self._get_room(room_id, loader)
+        with self._lock:
+            return room.origin, room.nights[:days]
+
+    def add_booking(self, room_id, booking_id, check_in, check_out):
+        args = (str(booking_id), to_ordinal(check_in), to_ordinal(check_out))
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is not None:
+                room.add(*args)
+            self._record_write(str(room_id), ('add', args))
+
+    def remove_booking(self, room_id, booking_id):
+        with self._lock:
+            room = self._rooms.get(str(room_id))
+            if room is not None:
+                room.remove(str(booking_id))
+            self._record_write(str(room_id), ('remove', (str(booking_id),)))
+
+    def invalidate(self, room_id=None):
+        with self._lock:
+            if room_id is None:
+                self._rooms.clear()
+                for loading_room_id in self._loading:
+                    self._record_write(loading_room_id, None)
+            else:
+                self._rooms.pop(str(room_id), None)
+                self._record_write(str(room_id), None)
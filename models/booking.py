@@ -1,17 +1,114 @@
-from pymongo import MongoClient
 from bson.objectid import ObjectId
-from datetime import datetime, timedelta
-import os
+from pymongo import ReturnDocument, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from datetime import date, datetime, timedelta
+from config import Config
+from itertools import islice
+import base64
+import re
+from models.database import Database
+from utils.cache import CacheNamespace
+from models.room import Room, room_change_listeners
+from models.user import User
+from models.booking_read_model import (BookingReconciler, room_snapshot, user_summary,
+                                       ROOM_SNAPSHOT_DEFAULTS, USER_SUMMARY_DEFAULTS)
+from models.pricing import pricing_engine
+from models.availability import (AvailabilityIndex, ACTIVE_STATUSES, overlap_filter, to_datetime, to_ordinal,
+                                 month_of, month_range, months_between, months_ahead)
+
+# Statuses whose price counts towards revenue
+REVENUE_STATUSES = ['confirmed', 'completed']
+STATS_ID = 'bookings'
+
+# Shared by every Booking instance in this process
+availability_index = AvailabilityIndex(ttl=Config.AVAILABILITY_INDEX_TTL)
+
+# Version stamp bumped by every booking write that can change room availability
+availability_versions = CacheNamespace('availability')
+
+# Rendered admin booking-details modals by booking id (filled by routes.booking)
+booking_modal_cache = CacheNamespace('booking_modals', ttl=Config.BOOKING_MODAL_CACHE_TTL)
+
+# Propagates room edits into the room snapshots embedded in bookings
+booking_reconciler = BookingReconciler()
+room_change_listeners.append(booking_reconciler.room_changed)
+
+def _serialize_booking(booking):
+    """Convert ids to strings and add the derived nights/guests fields (used by every read)"""
+    booking['_id'] = str(booking['_id'])
+    booking['user_id'] = str(booking['user_id'])
+    booking['room_id'] = str(booking['room_id'])
+    # Legacy bookings whose room/user no longer exists have no snapshot
+    room = dict(ROOM_SNAPSHOT_DEFAULTS, _id=booking['room_id'], amenities=[])
+    room.update(booking.get('room') or {})
+    user = dict(USER_SUMMARY_DEFAULTS, _id=booking['user_id'])
+    user.update(booking.get('user') or {})
+    booking['room'], booking['user'] = room, user
+    booking['room']['_id'] = str(booking['room']['_id'])
+    booking['user']['_id'] = str(booking['user']['_id'])
+    booking['user'].pop('password', None)
+    
+    check_in = booking['check_in']
+    check_out = booking['check_out']
+    check_in_date = check_in.date() if hasattr(check_in, 'date') else check_in
+    check_out_date = check_out.date() if hasattr(check_out, 'date') else check_out
+    
+    booking['nights'] = (check_out_date - check_in_date).days
+    booking['guests'] = booking.get('room', {}).get('capacity', 1)  # Default to room capacity
+    return booking
+
+def room_calendar(room_id):
+    """Booked nights of one room by 'YYYY-MM'; invalidated by that room's booking writes"""
+    return CacheNamespace(f'room_calendar:{room_id}', ttl=Config.AVAILABILITY_CACHE_TTL)
+
+def encode_cursor(created_at, booking_id):
+    """Encode a (created_at, _id) keyset position as an opaque token"""
+    raw = f"{created_at.isoformat()}|{booking_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor):
+    """Decode a token from encode_cursor; returns (created_at, ObjectId)"""
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    created_at, booking_id = raw.split('|', 1)
+    return datetime.fromisoformat(created_at), ObjectId(booking_id)
 
 class Booking:
+    # Declarative indexes per collection, applied by models.indexes.ensure_indexes
+    INDEXES = {
+        'bookings': [
+            IndexModel([('room_id', ASCENDING), ('status', ASCENDING), ('check_in', ASCENDING), ('check_out', ASCENDING)],
+                       name='room_status_dates'),
+            IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)], name='user_created_at'),
+            IndexModel([('status', ASCENDING), ('created_at', DESCENDING)], name='status_created_at'),
+            IndexModel([('created_at', DESCENDING), ('_id', DESCENDING)], name='created_at_id')
+        ],
+        'room_nights': [
+            # One claim per room per night; this is what makes booking creation race-free
+            IndexModel([('room_id', ASCENDING), ('night', ASCENDING)], unique=True, name='room_night_unique'),
+            IndexModel([('booking_id', ASCENDING)], name='booking_id')
+        ]
+    }
+    
     def __init__(self):
-        self.db = self._get_database()
-        self.collection = self.db.bookings
-        
-    def _get_database(self):
-        mongo_uri = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/hotel_booking')
-        client = MongoClient(mongo_uri)
-        return client.get_database()
+        self.availability = availability_index
+        self.reconciler = booking_reconciler
+
+    # Collections are looked up per use; see Database
+    @property
+    def db(self):
+        return Database().db
+
+    @property
+    def collection(self):
+        return self.db.bookings
+
+    @property
+    def night_claims(self):
+        return self.db.room_nights
+
+    @property
+    def stats_collection(self):
+        return self.db.booking_stats
     
     def create_booking(self, user_id, room_id, check_in, check_out, total_price):
         """Create a new booking"""
@@ -37,11 +134,27 @@ class Booking:
         if check_in < datetime.now().date():
             return {'success': False, 'message': 'Check-in date cannot be in the past'}
         
-        # Check room availability
+        # Check room availability (fast path; also covers bookings made before night claims)
         if not self.is_room_available(room_id, check_in, check_out):
             return {'success': False, 'message': 'Room is not available for the selected dates'}
         
+        # Snapshots embedded for lookup-free reads (both served from caches)
+        room = Room().get_room_by_id(room_id)
+        user = User().get_principal(user_id)
+        if not room['success'] or not user:
+            return {'success': False, 'message': 'Room or user not found'}
+        
+        # Claim every night of the stay; a concurrent booking for any of them fails here
+        booking_id = ObjectId()
+        try:
+            claimed = self._claim_nights(room_id, booking_id, check_in_dt, check_out_dt)
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+        if not claimed:
+            return {'success': False, 'message': 'Room is not available for the selected dates'}
+        
         booking_data = {
+            '_id': booking_id,
             'user_id': ObjectId(user_id),
             'room_id': ObjectId(room_id),
             'check_in': check_in_dt,
@@ -50,213 +163,348 @@ class Booking:
             'status': 'pending',
             'payment_id': None,
             'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
+            'updated_at': datetime.utcnow(),
+            'room': room_snapshot(room['room']),
+            'user': user_summary(user)
         }
         
         try:
             result = self.collection.insert_one(booking_data)
+            self.availability.add_booking(room_id, result.inserted_id, check_in_dt, check_out_dt)
+            self._availability_changed(room_id)
+            self._record_status_change(None, 'pending', booking_data['total_price'])
             return {'success': True, 'booking_id': str(result.inserted_id)}
         except Exception as e:
+            self._release_nights(booking_id)
             return {'success': False, 'message': str(e)}
     
+    def _claim_nights(self, room_id, booking_id, check_in, check_out):
+        """Insert one claim per night; returns False if any night is already taken"""
+        nights = []
+        night = to_datetime(check_in)
+        while night < to_datetime(check_out):
+            nights.append({
+                'room_id': ObjectId(room_id),
+                'night': night,
+                'booking_id': booking_id,
+                'created_at': datetime.utcnow()
+            })
+            night += timedelta(days=1)
+        
+        try:
+            # Ordered so the first duplicate stops the batch
+            self.night_claims.insert_many(nights, ordered=True)
+            return True
+        except BulkWriteError:
+            self._release_nights(booking_id)
+            return False
+    
+    def _release_nights(self, booking_id):
+        """Free the nights held by a booking"""
+        self.night_claims.delete_many({'booking_id': ObjectId(booking_id)})
+    
+    def backfill_night_claims(self):
+        """Create night claims for active bookings made before claims existed"""
+        claimed, conflicts = 0, []
+        for booking in self.collection.find({'status': {'$in': ACTIVE_STATUSES}}):
+            if self.night_claims.find_one({'booking_id': booking['_id']}, {'_id': 1}):
+                continue
+            if self._claim_nights(booking['room_id'], booking['_id'], booking['check_in'], booking['check_out']):
+                claimed += 1
+            else:
+                conflicts.append(str(booking['_id']))
+        return {'success': True, 'claimed': claimed, 'conflicts': conflicts}
+    
     def is_room_available(self, room_id, check_in, check_out):
         """Check if room is available for given dates"""
         try:
-            # Convert date objects to datetime objects for MongoDB compatibility
-            if hasattr(check_in, 'date'):
-                # It's already a datetime object
-                check_in_dt = check_in
-            else:
-                # It's a date object, convert to datetime
-                check_in_dt = datetime.combine(check_in, datetime.min.time())
-                
-            if hasattr(check_out, 'date'):
-                # It's already a datetime object
-                check_out_dt = check_out
-            else:
-                # It's a date object, convert to datetime
-                check_out_dt = datetime.combine(check_out, datetime.min.time())
-            
-            # Find conflicting bookings
-            conflicting_count = self.collection.count_documents({
-                'room_id': ObjectId(room_id),
-                'status': {'$in': ['pending', 'confirmed']},
-                '$or': [
-                    # Check-in date conflicts
-                    {
-                        'check_in': {'$lte': check_in_dt},
-                        'check_out': {'$gt': check_in_dt}
-                    },
-                    # Check-out date conflicts
-                    {
-                        'check_in': {'$lt': check_out_dt},
-                        'check_out': {'$gte': check_out_dt}
-                    },
-                    # Booking encompasses the requested period
-                    {
-                        'check_in': {'$gte': check_in_dt},
-                        'check_out': {'$lte': check_out_dt}
-                    }
-                ]
-            })
+            if Config.AVAILABILITY_INDEX_ENABLED:
+                return self.availability.is_available(
+                    room_id, check_in, check_out, self._load_active_intervals
+                )
             
-            return conflicting_count == 0
+            query = {'room_id': ObjectId(room_id), 'status': {'$in': ACTIVE_STATUSES}}
+            query.update(overlap_filter(check_in, check_out))
+            return self.collection.count_documents(query, limit=1) == 0
         except Exception as e:
             print(f"Error checking availability: {e}")
             return False
     
-    def get_user_bookings(self, user_id):
-        """Get all bookings for a user"""
+    def _availability_changed(self, room_id):
+        """Move availability caches (pages, room calendars) to a fresh version"""
+        availability_versions.invalidate()
+        room_calendar(room_id).invalidate()
+    
+    def get_booked_nights(self, months_by_room):
+        """Booked night ordinals per (room_id, 'YYYY-MM').
+        
+        Months cached for a room are reused; all the misses are loaded with
+        a single query spanning them.
+        """
+        booked, missing, versions = {}, {}, {}
+        for room_id, months in months_by_room.items():
+            calendar = room_calendar(room_id)
+            # Read before the query, so bookings written meanwhile invalidate what we load
+            versions[room_id] = calendar.version()
+            for month in months:
+                nights = calendar.get(month, versions[room_id])
+                if nights is None:
+                    missing.setdefault(room_id, set()).add(month)
+                else:
+                    booked[(room_id, month)] = set(nights)
+        
+        if missing:
+            loaded = {(room_id, month): set() for room_id, months in missing.items() for month in months}
+            all_months = sorted(set().union(*missing.values()))
+            start, end = month_range(all_months[0])[0], month_range(all_months[-1])[1]
+            
+            query = {'room_id': {'$in': [ObjectId(room_id) for room_id in missing]}, 'status': {'$in': ACTIVE_STATUSES}}
+            query.update(overlap_filter(date.fromordinal(start), date.fromordinal(end)))
+            for booking in self.collection.find(query, {'room_id': 1, 'check_in': 1, 'check_out': 1}):
+                room_id = str(booking['room_id'])
+                for night in range(max(to_ordinal(booking['check_in']), start), min(to_ordinal(booking['check_out']), end)):
+                    nights = loaded.get((room_id, month_of(night)))
+                    if nights is not None:
+                        nights.add(night)
+            
+            for (room_id, month), nights in loaded.items():
+                room_calendar(room_id).set(month, sorted(nights), versions[room_id])
+                booked[(room_id, month)] = nights
+        return booked
+    
+    def check_availability_batch(self, stays, calendar_months=None, calendar_rooms=None):
+        """Answer many (room_id, check_in, check_out) stays with at most one bookings query.
+        
+        Rooms are looked up once each through the room cache.
+        
+        Returns per-stay results in order (availability, conflicting nights
+        and a price breakdown) plus the booked dates of each calendar room
+        (default: the stays' rooms) for every month in ``calendar_months``.
+        """
         try:
-            pipeline = [
-                {'$match': {'user_id': ObjectId(user_id)}},
-                {'$lookup': {
-                    'from': 'rooms',
-                    'localField': 'room_id',
-                    'foreignField': '_id',
-                    'as': 'room'
-                }},
-                {'$unwind': '$room'},
-                {'$sort': {'created_at': -1}}
-            ]
+            calendar_months = calendar_months or []
+            calendar_rooms = calendar_rooms or {room_id for room_id, _, _ in stays}
+            months_by_room = {room_id: set(calendar_months) for room_id in calendar_rooms}
+            for room_id, check_in, check_out in stays:
+                months_by_room.setdefault(room_id, set()).update(months_between(check_in, check_out))
+            booked = self.get_booked_nights(months_by_room)
             
-            bookings = list(self.collection.aggregate(pipeline))
-            for booking in bookings:
-                booking['_id'] = str(booking['_id'])
-                booking['user_id'] = str(booking['user_id'])
-                booking['room_id'] = str(booking['room_id'])
-                booking['room']['_id'] = str(booking['room']['_id'])
-                
-                # Calculate additional fields
-                check_in = booking['check_in']
-                check_out = booking['check_out']
+            room_model = Room()
+            rooms = {room_id: room_model.get_room_by_id(room_id) for room_id in {stay[0] for stay in stays}}
+            results = []
+            for room_id, check_in, check_out in stays:
+                room = rooms[room_id]
+                if not room['success']:
+                    results.append({'room_id': room_id, 'success': False, 'message': 'Room not found'})
+                    continue
                 
-                # Handle both datetime and date objects
-                if hasattr(check_in, 'date'):
-                    check_in_date = check_in.date()
-                else:
-                    check_in_date = check_in
-                    
-                if hasattr(check_out, 'date'):
-                    check_out_date = check_out.date()
-                else:
-                    check_out_date = check_out
-                
-                booking['nights'] = (check_out_date - check_in_date).days
-                booking['guests'] = booking['room'].get('capacity', 1)  # Default to room capacity
+                conflicts = [
+                    date.fromordinal(night).isoformat()
+                    for night in range(to_ordinal(check_in), to_ordinal(check_out))
+                    if night in booked[(room_id, month_of(night))]
+                ]
+                results.append({
+                    'room_id': room_id,
+                    'success': True,
+                    'check_in': check_in.isoformat(),
+                    'check_out': check_out.isoformat(),
+                    'available': not conflicts and room['room'].get('available', True),
+                    'conflicts': conflicts,
+                    'price': self.price_breakdown(room['room'], check_in, check_out)
+                })
             
+            calendars = {
+                room_id: {
+                    month: [date.fromordinal(night).isoformat() for night in sorted(booked[(room_id, month)])]
+                    for month in calendar_months
+                }
+                for room_id in calendar_rooms
+            }
+            return {'success': True, 'results': results, 'calendars': calendars}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def _load_active_intervals(self, room_id):
+        """Load (booking_id, check_in, check_out) for a room's active bookings"""
+        cursor = self.collection.find(
+            {'room_id': ObjectId(room_id), 'status': {'$in': ACTIVE_STATUSES}},
+            {'check_in': 1, 'check_out': 1}
+        )
+        return [(b['_id'], b['check_in'], b['check_out']) for b in cursor]
+    
+    def get_room_occupancy(self, room_id, months=12):
+        """Per-night stay counts for a room from today to the start of the month ``months`` ahead"""
+        try:
+            today = date.today().toordinal()
+            start, nights = self.availability.occupancy(
+                room_id, self._load_active_intervals, months_ahead(today, months) - today
+            )
+            return {'success': True, 'start': date.fromordinal(start), 'nights': nights}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_booked_room_ids(self, check_in, check_out):
+        """Get ids of rooms with an active booking overlapping the given dates"""
+        query = {'status': {'$in': ACTIVE_STATUSES}}
+        query.update(overlap_filter(check_in, check_out))
+        return {str(room_id) for room_id in self.collection.distinct('room_id', query)}
+    
+    def search_available_rooms(self, check_in, check_out, min_price=None, max_price=None, min_capacity=None, amenities=None, amenity_match='any'):
+        """Search rooms that are free for the whole stay, using the room filters"""
+        if check_in >= check_out:
+            return {'success': False, 'message': 'Check-out date must be after check-in date'}
+        
+        try:
+            result = Room().search_rooms(min_price, max_price, min_capacity, amenities, amenity_match)
+            if not result['success']:
+                return result
+            
+            booked = self.get_booked_room_ids(check_in, check_out)
+            rooms = [room for room in result['rooms'] if room['_id'] not in booked]
+            return {'success': True, 'rooms': rooms}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_user_bookings(self, user_id, limit=None, offset=0, fields=None, stream=False):
+        """Get bookings for a user, newest first.
+        
+        ``limit``/``offset`` page the history and ``fields`` restricts the
+        booking fields returned (the embedded room is always included).
+        With ``stream=True`` the result holds a generator instead of a list.
+        """
+        try:
+            bookings = self.iter_user_bookings(user_id, limit, offset, fields)
+            if not stream:
+                bookings = list(bookings)
             return {'success': True, 'bookings': bookings}
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
-    def get_all_bookings(self):
-        """Get all bookings (admin use)"""
+    def iter_user_bookings(self, user_id, limit=None, offset=0, fields=None):
+        """Yield a user's bookings one at a time (see get_user_bookings)"""
+        projection = None
+        if fields:
+            # Fields the serializer always needs
+            projection = {field: 1 for field in fields}
+            projection.update({'user_id': 1, 'room_id': 1, 'check_in': 1, 'check_out': 1, 'room': 1, 'user': 1})
+        
+        cursor = self.collection.find({'user_id': ObjectId(user_id)}, projection, batch_size=100)
+        cursor = cursor.sort([('created_at', -1), ('_id', -1)]).skip(offset)
+        if limit:
+            cursor = cursor.limit(limit)
+        
+        # Snapshots are filled a batch at a time, not with a query per booking
+        while True:
+            bookings = list(islice(cursor, 100))
+            if not bookings:
+                break
+            self.reconciler.fill_missing(bookings)
+            for booking in bookings:
+                yield _serialize_booking(booking)
+    
+    def get_user_booking_stats(self, user_id):
+        """Count a user's bookings by status"""
         try:
+            stats = {'total': 0, 'pending': 0, 'confirmed': 0, 'cancelled': 0, 'completed': 0}
             pipeline = [
-                {'$lookup': {
-                    'from': 'rooms',
-                    'localField': 'room_id',
-                    'foreignField': '_id',
-                    'as': 'room'
-                }},
-                {'$lookup': {
-                    'from': 'users',
-                    'localField': 'user_id',
-                    'foreignField': '_id',
-                    'as': 'user'
-                }},
-                {'$unwind': '$room'},
-                {'$unwind': '$user'},
-                {'$sort': {'created_at': -1}}
+                {'$match': {'user_id': ObjectId(user_id)}},
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
             ]
+            for group in self.collection.aggregate(pipeline):
+                stats['total'] += group['count']
+                if group['_id'] in stats:
+                    stats[group['_id']] = group['count']
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_all_bookings(self):
+        """Get all bookings (admin use)"""
+        try:
+            bookings = list(self.collection.find().sort([('created_at', -1), ('_id', -1)]))
+            self.reconciler.fill_missing(bookings)
+            return {'success': True, 'bookings': [_serialize_booking(b) for b in bookings]}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_bookings_page(self, limit=20, cursor=None, status=None, date_from=None, date_to=None, guest=None, room=None):
+        """Get one page of bookings (admin use), newest first.
+        
+        A single indexed find; rooms and guests come from the embedded
+        snapshots. ``cursor`` is the ``next_cursor`` of the previous page.
+        """
+        try:
+            query = {}
+            if status:
+                query['status'] = status
+            if date_from:
+                query.setdefault('check_in', {})['$gte'] = to_datetime(date_from)
+            if date_to:
+                query.setdefault('check_in', {})['$lte'] = to_datetime(date_to)
+            if guest:
+                pattern = {'$regex': re.escape(guest), '$options': 'i'}
+                user_ids = self.db.users.distinct('_id', {'$or': [{'name': pattern}, {'email': pattern}]})
+                query['user_id'] = {'$in': user_ids}
+            if room:
+                pattern = {'$regex': re.escape(room), '$options': 'i'}
+                query['room_id'] = {'$in': self.db.rooms.distinct('_id', {'name': pattern})}
+            if cursor:
+                created_at, last_id = decode_cursor(cursor)
+                query['$or'] = [
+                    {'created_at': {'$lt': created_at}},
+                    {'created_at': created_at, '_id': {'$lt': last_id}}
+                ]
             
-            bookings = list(self.collection.aggregate(pipeline))
-            for booking in bookings:
-                booking['_id'] = str(booking['_id'])
-                booking['user_id'] = str(booking['user_id'])
-                booking['room_id'] = str(booking['room_id'])
-                booking['room']['_id'] = str(booking['room']['_id'])
-                booking['user']['_id'] = str(booking['user']['_id'])
-                # Remove password from user data
-                booking['user'].pop('password', None)
-                
-                # Calculate additional fields
-                check_in = booking['check_in']
-                check_out = booking['check_out']
-                
-                # Handle both datetime and date objects
-                if hasattr(check_in, 'date'):
-                    check_in_date = check_in.date()
-                else:
-                    check_in_date = check_in
-                    
-                if hasattr(check_out, 'date'):
-                    check_out_date = check_out.date()
-                else:
-                    check_out_date = check_out
-                
-                booking['nights'] = (check_out_date - check_in_date).days
-                booking['guests'] = booking['room'].get('capacity', 1)  # Default to room capacity
+            bookings = list(self.collection.find(query).sort([('created_at', -1), ('_id', -1)]).limit(limit + 1))
+            self.reconciler.fill_missing(bookings)
             
-            return {'success': True, 'bookings': bookings}
+            # The extra row only tells us whether another page exists
+            next_cursor = None
+            if len(bookings) > limit:
+                bookings = bookings[:limit]
+                next_cursor = encode_cursor(bookings[-1]['created_at'], bookings[-1]['_id'])
+            
+            return {
+                'success': True,
+                'bookings': [_serialize_booking(b) for b in bookings],
+                'next_cursor': next_cursor
+            }
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
     def get_booking_by_id(self, booking_id):
         """Get booking by ID"""
         try:
-            pipeline = [
-                {'$match': {'_id': ObjectId(booking_id)}},
-                {'$lookup': {
-                    'from': 'rooms',
-                    'localField': 'room_id',
-                    'foreignField': '_id',
-                    'as': 'room'
-                }},
-                {'$lookup': {
-                    'from': 'users',
-                    'localField': 'user_id',
-                    'foreignField': '_id',
-                    'as': 'user'
-                }},
-                {'$unwind': '$room'},
-                {'$unwind': '$user'}
-            ]
-            
-            booking = list(self.collection.aggregate(pipeline))
+            booking = self.collection.find_one({'_id': ObjectId(booking_id)})
             if booking:
-                booking = booking[0]
-                booking['_id'] = str(booking['_id'])
-                booking['user_id'] = str(booking['user_id'])
-                booking['room_id'] = str(booking['room_id'])
-                booking['room']['_id'] = str(booking['room']['_id'])
-                booking['user']['_id'] = str(booking['user']['_id'])
-                booking['user'].pop('password', None)
-                
-                # Calculate additional fields
-                check_in = booking['check_in']
-                check_out = booking['check_out']
-                
-                # Handle both datetime and date objects
-                if hasattr(check_in, 'date'):
-                    check_in_date = check_in.date()
-                else:
-                    check_in_date = check_in
-                    
-                if hasattr(check_out, 'date'):
-                    check_out_date = check_out.date()
-                else:
-                    check_out_date = check_out
-                
-                booking['nights'] = (check_out_date - check_in_date).days
-                booking['guests'] = booking['room'].get('capacity', 1)  # Default to room capacity
-                
-                return {'success': True, 'booking': booking}
+                self.reconciler.fill_missing([booking])
+                return {'success': True, 'booking': _serialize_booking(booking)}
             
             return {'success': False, 'message': 'Booking not found'}
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
+    def get_bookings_by_ids(self, booking_ids):
+        """Get several bookings in one query; returns {booking_id: booking}"""
+        try:
+            ids = [ObjectId(booking_id) for booking_id in booking_ids if ObjectId.is_valid(booking_id)]
+            bookings = list(self.collection.find({'_id': {'$in': ids}}))
+            self.reconciler.fill_missing(bookings)
+            return {'success': True, 'bookings': {str(b['_id']): _serialize_booking(b) for b in bookings}}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def get_booking_versions(self, booking_ids):
+        """Get {booking_id: (updated_at, snapshot_at)} without loading the bookings themselves"""
+        try:
+            ids = [ObjectId(booking_id) for booking_id in booking_ids if ObjectId.is_valid(booking_id)]
+            cursor = self.collection.find({'_id': {'$in': ids}}, {'updated_at': 1, 'snapshot_at': 1})
+            return {'success': True, 'versions': {
+                str(b['_id']): (b.get('updated_at'), b.get('snapshot_at')) for b in cursor
+            }}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
     def update_booking_status(self, booking_id, status, payment_id=None):
         """Update booking status"""
         valid_statuses = ['pending', 'confirmed', 'cancelled', 'completed']
@@ -264,6 +512,16 @@ class Booking:
             return {'success': False, 'message': 'Invalid status'}
         
         try:
+            current = self.collection.find_one({'_id': ObjectId(booking_id)})
+            if not current:
+                return {'success': False, 'message': 'Booking not found or no changes made'}
+            
+            # Re-activating a booking must win its nights back first
+            was_active = current['status'] in ACTIVE_STATUSES
+            if status in ACTIVE_STATUSES and not was_active:
+                if not self._claim_nights(current['room_id'], current['_id'], current['check_in'], current['check_out']):
+                    return {'success': False, 'message': 'Room is no longer available for these dates'}
+            
             update_data = {
                 'status': status,
                 'updated_at': datetime.utcnow()
@@ -272,12 +530,28 @@ class Booking:
             if payment_id:
                 update_data['payment_id'] = payment_id
             
-            result = self.collection.update_one(
-                {'_id': ObjectId(booking_id)},
-                {'$set': update_data}
+            # Only apply if nobody changed the status meanwhile, so counters stay exact
+            booking = self.collection.find_one_and_update(
+                {'_id': current['_id'], 'status': current['status']},
+                {'$set': update_data},
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count > 0:
+            if not booking and status in ACTIVE_STATUSES and not was_active:
+                self._release_nights(current['_id'])
+            
+            if booking:
+                self._record_status_change(current['status'], status, booking.get('total_price', 0))
+                if status in ACTIVE_STATUSES:
+                    self.availability.add_booking(
+                        booking['room_id'], booking['_id'], booking['check_in'], booking['check_out']
+                    )
+                else:
+                    if was_active:
+                        self._release_nights(booking['_id'])
+                    self.availability.remove_booking(booking['room_id'], booking['_id'])
+                self._availability_changed(booking['room_id'])
+                booking_modal_cache.delete(str(booking['_id']))
                 return {'success': True, 'message': f'Booking status updated to {status}'}
             return {'success': False, 'message': 'Booking not found or no changes made'}
         except Exception as e:
@@ -310,7 +584,8 @@ class Booking:
             if check_in_date <= datetime.now().date():
                 return {'success': False, 'message': 'Cannot cancel booking on or after check-in date'}
             
-            # Update status
+            # Update status (guarded on the status we checked above)
+            query['status'] = booking['status']
             result = self.collection.update_one(
                 query,
                 {
@@ -322,6 +597,11 @@ class Booking:
             )
             
             if result.modified_count > 0:
+                self._record_status_change(booking['status'], 'cancelled', booking.get('total_price', 0))
+                self._release_nights(booking['_id'])
+                self.availability.remove_booking(booking['room_id'], booking['_id'])
+                self._availability_changed(booking['room_id'])
+                booking_modal_cache.delete(str(booking['_id']))
                 return {'success': True, 'message': 'Booking cancelled successfully'}
             return {'success': False, 'message': 'Failed to cancel booking'}
         except Exception as e:
@@ -330,41 +610,86 @@ class Booking:
     def get_booking_stats(self):
         """Get booking statistics for admin dashboard"""
         try:
-            total_bookings = self.collection.count_documents({})
-            pending_bookings = self.collection.count_documents({'status': 'pending'})
-            confirmed_bookings = self.collection.count_documents({'status': 'confirmed'})
-            cancelled_bookings = self.collection.count_documents({'status': 'cancelled'})
-            completed_bookings = self.collection.count_documents({'status': 'completed'})
+            if not Config.BOOKING_STATS_COUNTERS:
+                return {'success': True, 'stats': self._compute_booking_stats()}
             
-            # Calculate total revenue (confirmed + completed bookings)
-            revenue_pipeline = [
-                {'$match': {'status': {'$in': ['confirmed', 'completed']}}},
-                {'$group': {'_id': None, 'total_revenue': {'$sum': '$total_price'}}}
-            ]
+            counters = self.stats_collection.find_one({'_id': STATS_ID}) or {}
+            # A document created by a transition alone has never been reconciled
+            reconciled_at = counters.get('reconciled_at')
+            cutoff = datetime.utcnow() - timedelta(seconds=Config.BOOKING_STATS_RECONCILE_INTERVAL)
+            if reconciled_at is None or reconciled_at < cutoff:
+                return self.rebuild_booking_stats()
             
-            revenue_result = list(self.collection.aggregate(revenue_pipeline))
-            total_revenue = revenue_result[0]['total_revenue'] if revenue_result else 0
-            
-            return {
-                'success': True,
-                'stats': {
-                    'total': total_bookings,
-                    'pending': pending_bookings,
-                    'confirmed': confirmed_bookings,
-                    'cancelled': cancelled_bookings,
-                    'completed': completed_bookings,
-                    'revenue': total_revenue
-                }
-            }
+            stats = {'total': 0, 'pending': 0, 'confirmed': 0, 'cancelled': 0, 'completed': 0, 'revenue': 0}
+            stats.update((key, value) for key, value in counters.items() if key in stats)
+            return {'success': True, 'stats': stats}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def _compute_booking_stats(self):
+        """Compute status counts and revenue in a single aggregation"""
+        pipeline = [
+            {'$group': {
+                '_id': '$status',
+                'count': {'$sum': 1},
+                'amount': {'$sum': '$total_price'}
+            }}
+        ]
+        
+        stats = {'total': 0, 'pending': 0, 'confirmed': 0, 'cancelled': 0, 'completed': 0, 'revenue': 0}
+        for group in self.collection.aggregate(pipeline):
+            stats['total'] += group['count']
+            if group['_id'] in stats:
+                stats[group['_id']] = group['count']
+            if group['_id'] in REVENUE_STATUSES:
+                stats['revenue'] += group['amount']
+        return stats
+    
+    def rebuild_booking_stats(self):
+        """Recompute the counters document from the bookings collection"""
+        try:
+            stats = self._compute_booking_stats()
+            self.stats_collection.replace_one(
+                {'_id': STATS_ID}, dict(stats, reconciled_at=datetime.utcnow()), upsert=True
+            )
+            return {'success': True, 'stats': stats}
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
-    def calculate_booking_price(self, room_price, check_in, check_out):
+    def _record_status_change(self, old_status, new_status, total_price):
+        """Apply a booking status transition to the counters document"""
+        if not Config.BOOKING_STATS_COUNTERS or old_status == new_status:
+            return
+        
+        increments = {}
+        if old_status is None:
+            increments['total'] = 1
+        else:
+            increments[old_status] = -1
+        increments[new_status] = increments.get(new_status, 0) + 1
+        
+        revenue = 0
+        if old_status in REVENUE_STATUSES:
+            revenue -= total_price
+        if new_status in REVENUE_STATUSES:
+            revenue += total_price
+        if revenue:
+            increments['revenue'] = revenue
+        
+        try:
+            # Upsert so no transition is dropped before the first read creates the document
+            self.stats_collection.update_one({'_id': STATS_ID}, {'$inc': increments}, upsert=True)
+        except Exception as e:
+            print(f"Error updating booking counters: {e}")
+    
+    def calculate_booking_price(self, room, check_in, check_out):
         """Calculate total booking price"""
+        return self.price_breakdown(room, check_in, check_out)['total']
+    
+    def price_breakdown(self, room, check_in, check_out):
+        """Nightly rates, discount and total for a stay, from the room's compiled rate table"""
         if isinstance(check_in, str):
             check_in = datetime.strptime(check_in, '%Y-%m-%d').date()
         if isinstance(check_out, str):
             check_out = datetime.strptime(check_out, '%Y-%m-%d').date()
-        
-        nights = (check_out - check_in).days
-        return float(room_price) * nights if nights > 0 else 0
+        return pricing_engine.quote(room, check_in, check_out)
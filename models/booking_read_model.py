@@ -0,0 +1,147 @@
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from models.database import Database
+import os
+import threading
+import time
+
+# Fields copied into every booking at write time, so reads need no $lookup;
+# snapshot_at records when a booking's copies were last rewritten
+ROOM_SNAPSHOT_FIELDS = ('name', 'description', 'price', 'capacity', 'amenities', 'image_url', 'type')
+USER_SUMMARY_FIELDS = ('name', 'email', 'phone')
+
+# Placeholders for bookings whose room or user no longer exists, so templates can render them
+ROOM_SNAPSHOT_DEFAULTS = {'name': '', 'description': '', 'price': 0.0, 'capacity': 1, 'image_url': '', 'type': ''}
+USER_SUMMARY_DEFAULTS = {'name': '', 'email': '', 'phone': ''}
+
+
+def room_snapshot(room):
+    """The part of a room document embedded in its bookings"""
+    snapshot = {'_id': ObjectId(room['_id'])}
+    snapshot.update({field: room[field] for field in ROOM_SNAPSHOT_FIELDS if field in room})
+    return snapshot
+
+
+def user_summary(user):
+    """The part of a user document embedded in their bookings (never the password)"""
+    summary = {'_id': ObjectId(user['_id'])}
+    summary.update({field: user[field] for field in USER_SUMMARY_FIELDS if field in user})
+    return summary
+
+
+class BookingReconciler:
+    """Keeps the room/user copies embedded in bookings in step with the sources.
+
+    Room writes are queued with ``room_changed`` and applied on a background
+    thread. ``reconcile_all`` walks every room and booked user to repair
+    drift (e.g. edits made outside the app); ``start`` runs it periodically.
+    Booking documents written before snapshots existed are filled in on
+    first read by ``fill_missing``.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._executor_pid = None
+        self._loop_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return Database().db
+
+    def _submit(self, fn, *args):
+        # Worker threads do not survive a fork
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='booking-reconciler')
+                self._executor_pid = os.getpid()
+            return self._executor.submit(fn, *args)
+
+    def room_changed(self, room_id, room):
+        """Queue propagation of a room write; deleted rooms keep their last snapshot"""
+        if room is not None:
+            self._submit(self._safely, self.sync_room, dict(room, _id=room_id))
+
+    def _safely(self, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"Error reconciling booking snapshots: {e}")
+
+    def sync_room(self, room):
+        """Rewrite the snapshot in every booking of this room that differs; returns the count"""
+        snapshot = room_snapshot(room)
+        result = self.db.bookings.update_many(
+            {'room_id': snapshot['_id'], 'room': {'$ne': snapshot}},
+            {'$set': {'room': snapshot, 'snapshot_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    def sync_user(self, user):
+        """Rewrite the summary in every booking of this user that differs; returns the count"""
+        summary = user_summary(user)
+        result = self.db.bookings.update_many(
+            {'user_id': summary['_id'], 'user': {'$ne': summary}},
+            {'$set': {'user': summary, 'snapshot_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    def reconcile_all(self, batch_size=500):
+        """Bring every booking's embedded room and user up to date"""
+        report = {'rooms': 0, 'users': 0}
+        for room in self.db.rooms.find({}, {field: 1 for field in ROOM_SNAPSHOT_FIELDS}):
+            report['rooms'] += self.sync_room(room)
+
+        user_ids = self.db.bookings.distinct('user_id')
+        projection = {field: 1 for field in USER_SUMMARY_FIELDS}
+        for start in range(0, len(user_ids), batch_size):
+            for user in self.db.users.find({'_id': {'$in': user_ids[start:start + batch_size]}}, projection):
+                report['users'] += self.sync_user(user)
+        return report
+
+    def fill_missing(self, bookings):
+        """Embed snapshots into legacy booking documents in place and persist them"""
+        missing = [b for b in bookings if 'room' not in b or 'user' not in b]
+        if not missing:
+            return bookings
+
+        room_ids = {b['room_id'] for b in missing if 'room' not in b}
+        user_ids = {b['user_id'] for b in missing if 'user' not in b}
+        rooms = {r['_id']: room_snapshot(r) for r in self.db.rooms.find({'_id': {'$in': list(room_ids)}})}
+        users = {u['_id']: user_summary(u) for u in self.db.users.find({'_id': {'$in': list(user_ids)}})}
+
+        operations, now = [], datetime.utcnow()
+        for booking in missing:
+            updates = {}
+            if 'room' not in booking and booking['room_id'] in rooms:
+                updates['room'] = rooms[booking['room_id']]
+            if 'user' not in booking and booking['user_id'] in users:
+                updates['user'] = users[booking['user_id']]
+            if updates:
+                booking.update(updates)
+                operations.append(UpdateOne({'_id': booking['_id']}, {'$set': dict(updates, snapshot_at=now)}))
+
+        if operations:
+            try:
+                self.db.bookings.bulk_write(operations, ordered=False)
+            except Exception as e:
+                print(f"Error storing booking snapshots: {e}")
+        return bookings
+
+    def start(self, interval):
+        """Run reconcile_all every interval seconds on a daemon thread (once per process).
+
+        Cheap to call repeatedly; a forked worker gets its own loop on its first call.
+        """
+        if not interval or self._loop_pid == os.getpid():
+            return
+        self._loop_pid = os.getpid()
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self._safely(self.reconcile_all)
+
+        threading.Thread(target=loop, daemon=True, name='booking-reconcile-loop').start()
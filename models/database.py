@@ -0,0 +1,146 @@
+from pymongo import MongoClient, monitoring
+from config import Config
+import os
+import threading
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool counters for the shared client"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {
+                'pools_created': 0,
+                'pools_cleared': 0,
+                'connections_created': 0,
+                'connections_closed': 0,
+                'checked_out': 0,
+                'checked_in': 0,
+                'checkout_failures': 0
+            }
+
+    def _incr(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def pool_created(self, event):
+        self._incr('pools_created')
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr('pools_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr('connections_created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr('connections_closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr('checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._incr('checked_out')
+
+    def connection_checked_in(self, event):
+        self._incr('checked_in')
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['open_connections'] = stats['connections_created'] - stats['connections_closed']
+        stats['in_use'] = stats['checked_out'] - stats['checked_in']
+        return stats
+
+
+class Database:
+    """Process-wide MongoDB connection manager shared by all models.
+
+    One pooled MongoClient is created per process. After a fork (e.g. gunicorn
+    pre-fork workers) the child detects the new pid and builds its own client,
+    since pymongo clients must not be shared across forks. Models look up
+    ``Database().db`` on each use instead of keeping the handle, so instances
+    created at import time in the parent follow the child's client.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None or cls._instance.pid != os.getpid():
+            with cls._lock:
+                if cls._instance is None or cls._instance.pid != os.getpid():
+                    instance = super(Database, cls).__new__(cls)
+                    instance._connect()
+                    cls._instance = instance
+        return cls._instance
+
+    def _connect(self):
+        self.pid = os.getpid()
+        self.listener = PoolStatsListener()
+        self.client = MongoClient(
+            Config.MONGO_URI,
+            maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+            minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+            serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[self.listener],
+            connect=False
+        )
+        self.db = self.client.get_database()
+
+    def pool_stats(self):
+        """Get connection pool configuration and usage counters"""
+        options = self.client.options.pool_options
+        stats = self.listener.snapshot()
+        stats.update({
+            'pid': self.pid,
+            'max_pool_size': options.max_pool_size,
+            'min_pool_size': options.min_pool_size,
+            'max_idle_time_seconds': options.max_idle_time_seconds,
+            'connect_timeout': options.connect_timeout,
+            'socket_timeout': options.socket_timeout,
+            'wait_queue_timeout': options.wait_queue_timeout
+        })
+        return stats
+
+    @classmethod
+    def reset(cls):
+        """Drop the shared client (used after fork and at shutdown)"""
+        with cls._lock:
+            instance = cls._instance
+            cls._instance = None
+        if instance is not None and instance.pid == os.getpid():
+            instance.client.close()
+
+
+def _reset_after_fork():
+    # The parent's client (and its sockets) must never be used in the child
+    Database._instance = None
+    Database._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_db():
+    """Get the shared database handle"""
+    return Database().db
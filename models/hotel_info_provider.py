@@ -0,0 +1,86 @@
+from pymongo.errors import PyMongoError
+import copy
+import os
+import threading
+import time
+
+
+class HotelInfoProvider:
+    """Process-wide cache of the single hotel_info document.
+
+    Reads are served from memory. Local writes call ``invalidate()``; writes
+    from other workers are noticed either through a change stream (when
+    ``use_change_stream`` is set and the server supports it) or by polling
+    the document's ``updated_at`` at most every ``poll_interval`` seconds.
+    """
+
+    def __init__(self, poll_interval=30, use_change_stream=False):
+        self.poll_interval = poll_interval
+        self.use_change_stream = use_change_stream
+        self.version = 0
+        self._doc = None
+        self._checked_at = 0
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+        self._watching = False
+
+    def get(self, collection, loader):
+        """Get the cached document, calling loader() when it is missing or changed"""
+        self._start_watcher(collection)
+        with self._lock:
+            doc = self._doc
+            fresh = self._watching or time.monotonic() - self._checked_at < self.poll_interval
+        if doc is not None and fresh:
+            return copy.deepcopy(doc)
+
+        if doc is not None:
+            # Cheap check: only the timestamp crosses the wire
+            current = collection.find_one({'type': 'hotel_info'}, {'updated_at': 1})
+            if current and current.get('updated_at') == doc.get('updated_at'):
+                with self._lock:
+                    self._checked_at = time.monotonic()
+                return copy.deepcopy(doc)
+
+        doc = loader()
+        if doc is not None:
+            with self._lock:
+                self._doc = copy.deepcopy(doc)
+                self._checked_at = time.monotonic()
+                self.version += 1
+        return doc
+
+    def invalidate(self):
+        with self._lock:
+            self._doc = None
+            self.version += 1
+
+    def last_modified(self):
+        """updated_at of the cached document, if any"""
+        with self._lock:
+            return self._doc.get('updated_at') if self._doc else None
+
+    def _start_watcher(self, collection):
+        # One watcher per process; threads do not survive a fork
+        if not self.use_change_stream or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            self._watching = False
+        threading.Thread(target=self._watch, args=(collection,), daemon=True,
+                         name='hotel-info-watcher').start()
+
+    def _watch(self, collection):
+        try:
+            with collection.watch() as stream:
+                with self._lock:
+                    self._watching = True
+                for _ in stream:
+                    self.invalidate()
+        except PyMongoError as e:
+            # Standalone servers have no change streams; polling takes over
+            print(f"Hotel info change stream unavailable, polling instead: {e}")
+        finally:
+            with self._lock:
+                self._watching = False
@@ -0,0 +1,103 @@
+from bson.objectid import ObjectId
+from pymongo.errors import PyMongoError
+from datetime import datetime, timedelta
+from models.database import Database
+from models.user import User, EMAIL_COLLATION
+from models.room import Room
+from models.booking import Booking
+from models.location import Location
+from models.place import Place
+from models.availability import ACTIVE_STATUSES, overlap_filter
+
+# Every model that declares an INDEXES registry
+INDEXED_MODELS = [User, Room, Booking, Location, Place]
+
+
+def ensure_indexes(db=None):
+    """Create every registered index; safe to run on each startup"""
+    db = db if db is not None else Database().db
+    report = {'created': [], 'errors': []}
+    for model in INDEXED_MODELS:
+        for collection_name, indexes in model.INDEXES.items():
+            if not indexes:
+                continue
+            try:
+                names = db[collection_name].create_indexes(indexes)
+                report['created'].extend(f"{collection_name}.{name}" for name in names)
+            except PyMongoError as e:
+                report['errors'].append(f"{collection_name}: {e}")
+    return report
+
+
+def _hot_queries():
+    """Representative filters/sorts for the queries on request paths"""
+    sample_id = ObjectId()
+    check_in = datetime.combine(datetime.now().date(), datetime.min.time())
+    check_out = check_in + timedelta(days=3)
+    room_overlap = {'room_id': sample_id, 'status': {'$in': ACTIVE_STATUSES}}
+    room_overlap.update(overlap_filter(check_in, check_out))
+    booked_rooms = {'status': {'$in': ACTIVE_STATUSES}}
+    booked_rooms.update(overlap_filter(check_in, check_out))
+
+    return [
+        ('Booking.is_room_available', 'bookings', room_overlap, None),
+        ('Booking._load_active_intervals', 'bookings',
+         {'room_id': sample_id, 'status': {'$in': ACTIVE_STATUSES}}, None),
+        ('Booking.get_booked_room_ids', 'bookings', booked_rooms, None),
+        ('Booking.get_user_bookings', 'bookings', {'user_id': sample_id}, [('created_at', -1), ('_id', -1)]),
+        ('Booking.get_bookings_page', 'bookings', {}, [('created_at', -1), ('_id', -1)]),
+        ('Booking.get_bookings_page(status)', 'bookings', {'status': 'pending'}, [('created_at', -1)]),
+        ('Booking._release_nights', 'room_nights', {'booking_id': sample_id}, None),
+        ('Room.get_all_rooms', 'rooms', {'available': True}, [('price', 1)]),
+        ('Room.search_rooms', 'rooms',
+         {'available': True, 'price': {'$gte': 0, '$lte': 1000}, 'capacity': {'$gte': 1}}, [('price', 1)]),
+        ('User.authenticate_user', 'users', {'email': 'guest@example.com'}, None, EMAIL_COLLATION),
+        ('User.create_admin_user', 'users', {'role': 'admin'}, None),
+        ('Location.get_hotel_info', 'hotel_info', {'type': 'hotel_info'}, None),
+        ('Place.find_nearby', 'places',
+         {'place_type': 'restaurant', 'location': {'$nearSphere': {
+             '$geometry': {'type': 'Point', 'coordinates': [-73.9845, 40.7590]}, '$maxDistance': 5000}}}, None),
+        ('Place.has_places', 'places', {'place_type': 'restaurant'}, None)
+    ]
+
+
+def _plan_stages(plan):
+    """Collect every 'stage' name in an explain plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def explain_hot_queries(db=None):
+    """Run explain() on each hot query and report whether it uses an index"""
+    db = db if db is not None else Database().db
+    results = []
+    for label, collection_name, query, sort, *collation in _hot_queries():
+        cursor = db[collection_name].find(query, collation=collation[0] if collation else None)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+            stages = _plan_stages(plan)
+            results.append({
+                'query': label,
+                'collection': collection_name,
+                'stages': stages,
+                'uses_index': 'COLLSCAN' not in stages
+            })
+        except PyMongoError as e:
+            results.append({
+                'query': label,
+                'collection': collection_name,
+                'stages': [],
+                'uses_index': False,
+                'error': str(e)
+            })
+    return results
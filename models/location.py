@@ -1,29 +1,244 @@
-from pymongo import MongoClient
+from pymongo import IndexModel, ASCENDING
 from config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import requests
+import copy
 import json
+import threading
+from models.database import Database
+from models.hotel_info_provider import HotelInfoProvider
+from models.place import Place
+from utils.cache import CacheNamespace, SingleFlight
+from utils.geo import METERS_PER_MILE, PlaceSet, sort_by_distance
+from utils.http_client import HttpClient, CircuitOpenError, UpstreamError
+
+# Nearby-places responses list at most this many places, nearest first
+NEARBY_RESULT_LIMIT = 10
+
+# Smaller-radius queries are answered locally from the result set fetched at this radius
+WIDE_SEARCH_RADIUS = 5000
+
+# Radius bounds (meters) for nearby-places requests; above the wide search radius
+# every distinct value would be its own cache key and upstream fetch
+MIN_NEARBY_RADIUS = 100
+MAX_NEARBY_RADIUS = WIDE_SEARCH_RADIUS
+
+# Supported place types and the Google Places type each is searched as
+GOOGLE_PLACE_TYPES = {
+    'tourist_attraction': 'tourist_attraction',
+    'restaurant': 'restaurant',
+    'shopping_mall': 'shopping_mall',
+    'hospital': 'hospital',
+    'bank': 'bank',
+    'gas_station': 'gas_station',
+    'pharmacy': 'pharmacy'
+}
+
+# Nearby Search body statuses that carry real results; others (OVER_QUERY_LIMIT, REQUEST_DENIED, ...) are errors
+PLACES_OK_STATUSES = ('OK', 'ZERO_RESULTS')
+
+# Pooled client for every Google Maps call made by this process
+maps_client = HttpClient(
+    connect_timeout=Config.MAPS_CONNECT_TIMEOUT,
+    read_timeout=Config.MAPS_READ_TIMEOUT,
+    max_retries=Config.MAPS_MAX_RETRIES,
+    pool_size=Config.MAPS_POOL_SIZE,
+    failure_threshold=Config.MAPS_BREAKER_THRESHOLD,
+    reset_timeout=Config.MAPS_BREAKER_RESET
+)
+
+# The hotel_info document, served from memory in every worker
+hotel_info_provider = HotelInfoProvider(
+    poll_interval=Config.HOTEL_INFO_POLL_INTERVAL,
+    use_change_stream=Config.HOTEL_INFO_CHANGE_STREAM
+)
+
+# Nearby-places results: in-process layer in front of the places_cache collection
+places_cache = CacheNamespace('places', ttl=Config.PLACES_CACHE_MAX_STALE)
+
+# Place details by place_id; concurrent misses for one id share a single fetch
+place_details_cache = CacheNamespace('place_details', ttl=Config.PLACE_DETAILS_CACHE_TTL)
+
+# Served when the Google Places API is not configured or unavailable
+MOCK_PLACES = {
+    'tourist_attraction': [
+        {
+            'name': 'Times Square',
+            'address': 'Times Square, New York, NY 10036',
+            'distance': '0.1 miles',
+            'rating': 4.2,
+            'type': 'Tourist Attraction',
+            'coordinates': {'lat': 40.7580, 'lng': -73.9855}
+        },
+        {
+            'name': 'Broadway Theater District',
+            'address': 'Broadway, New York, NY 10036',
+            'distance': '0.2 miles',
+            'rating': 4.8,
+            'type': 'Entertainment District',
+            'coordinates': {'lat': 40.7590, 'lng': -73.9845}
+        },
+        {
+            'name': 'Empire State Building',
+            'address': '350 5th Ave, New York, NY 10118',
+            'distance': '0.6 miles',
+            'rating': 4.5,
+            'type': 'Landmark',
+            'coordinates': {'lat': 40.7484, 'lng': -73.9857}
+        },
+        {
+            'name': 'Central Park',
+            'address': 'Central Park, New York, NY 10024',
+            'distance': '0.8 miles',
+            'rating': 4.7,
+            'type': 'Park',
+            'coordinates': {'lat': 40.7829, 'lng': -73.9654}
+        },
+        {
+            'name': 'Rockefeller Center',
+            'address': '45 Rockefeller Plaza, New York, NY 10111',
+            'distance': '0.4 miles',
+            'rating': 4.6,
+            'type': 'Tourist Attraction',
+            'coordinates': {'lat': 40.7587, 'lng': -73.9787}
+        }
+    ],
+    'restaurant': [
+        {
+            'name': 'Carmines',
+            'address': '200 W 44th St, New York, NY 10036',
+            'distance': '0.1 miles',
+            'rating': 4.4,
+            'type': 'Italian Restaurant',
+            'coordinates': {'lat': 40.7589, 'lng': -73.9851}
+        },
+        {
+            'name': 'Juniors Restaurant',
+            'address': '386 Flatbush Ave Ext, Brooklyn, NY 11201',
+            'distance': '0.2 miles',
+            'rating': 4.3,
+            'type': 'American Restaurant',
+            'coordinates': {'lat': 40.7580, 'lng': -73.9840}
+        },
+        {
+            'name': 'The View Restaurant',
+            'address': '1535 Broadway, New York, NY 10036',
+            'distance': '0.1 miles',
+            'rating': 4.2,
+            'type': 'American Fine Dining',
+            'coordinates': {'lat': 40.7582, 'lng': -73.9856}
+        },
+        {
+            'name': 'Blue Fin',
+            'address': '1567 Broadway, New York, NY 10036',
+            'distance': '0.1 miles',
+            'rating': 4.1,
+            'type': 'Seafood Restaurant',
+            'coordinates': {'lat': 40.7590, 'lng': -73.9850}
+        },
+        {
+            'name': "Joe Allen Restaurant",
+            'address': '326 W 46th St, New York, NY 10036',
+            'distance': '0.2 miles',
+            'rating': 4.3,
+            'type': 'American Bistro',
+            'coordinates': {'lat': 40.7595, 'lng': -73.9870}
+        }
+    ],
+    'shopping_mall': [
+        {
+            'name': 'Times Square Tower',
+            'address': '7 Times Square, New York, NY 10036',
+            'distance': '0.1 miles',
+            'rating': 4.2,
+            'type': 'Shopping Center',
+            'coordinates': {'lat': 40.7580, 'lng': -73.9855}
+        },
+        {
+            'name': "Macy's Herald Square",
+            'address': '151 W 34th St, New York, NY 10001',
+            'distance': '0.7 miles',
+            'rating': 4.1,
+            'type': 'Department Store',
+            'coordinates': {'lat': 40.7505, 'lng': -73.9934}
+        },
+        {
+            'name': 'Bryant Park Shops',
+            'address': 'Bryant Park, New York, NY 10018',
+            'distance': '0.3 miles',
+            'rating': 4.3,
+            'type': 'Shopping District',
+            'coordinates': {'lat': 40.7536, 'lng': -73.9832}
+        },
+        {
+            'name': 'The Shops at Columbus Circle',
+            'address': '10 Columbus Cir, New York, NY 10019',
+            'distance': '0.9 miles',
+            'rating': 4.4,
+            'type': 'Shopping Mall',
+            'coordinates': {'lat': 40.7681, 'lng': -73.9819}
+        }
+    ]
+}
+
+# Coordinate arrays of the mock places, built once per type
+MOCK_PLACE_SETS = {place_type: PlaceSet(places) for place_type, places in MOCK_PLACES.items()}
+EMPTY_PLACE_SET = PlaceSet([])
+_place_details_flight = SingleFlight()
+
+# Background refreshes of stale places entries (stale-while-revalidate)
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='places-refresh')
+_refreshing = set()
+_refreshing_lock = threading.Lock()
 
 class Location:
+    INDEXES = {
+        'hotel_info': [
+            IndexModel([('type', ASCENDING)], name='type')
+        ],
+        'places_cache': [
+            # Entries past the stale window are removed by MongoDB
+            IndexModel([('fetched_at', ASCENDING)], name='fetched_at_ttl',
+                       expireAfterSeconds=Config.PLACES_CACHE_MAX_STALE)
+        ]
+    }
+    
     def __init__(self):
-        """Initialize Location model with MongoDB connection"""
-        self.client = MongoClient(Config.MONGO_URI)
-        self.db = self.client.hotel_booking
-        self.collection = self.db.hotel_info
+        """Initialize Location model"""
         self.google_api_key = Config.GOOGLE_MAPS_API_KEY
+        self.places_api_url = Config.GOOGLE_PLACES_API_URL
+        self.http = maps_client
+        self.place_store = Place()
+        self.hotel_info_provider = hotel_info_provider
+
+    @property
+    def db(self):
+        return Database().db
+
+    @property
+    def collection(self):
+        return self.db.hotel_info
+
+    @property
+    def places_collection(self):
+        return self.db.places_cache
     
     def get_hotel_info(self):
         """Get hotel location and contact information"""
         try:
-            hotel_info = self.collection.find_one({'type': 'hotel_info'})
-            if not hotel_info:
-                # Create default hotel information
-                hotel_info = self.create_default_hotel_info()
-            return hotel_info
+            return self.hotel_info_provider.get(self.collection, self._load_hotel_info)
         except Exception as e:
             print(f"Error getting hotel info: {e}")
             return None
     
+    def _load_hotel_info(self):
+        """Load hotel information from MongoDB, creating the default if missing"""
+        hotel_info = self.collection.find_one({'type': 'hotel_info'})
+        if not hotel_info:
+            # Create default hotel information
+            hotel_info = self.create_default_hotel_info()
+        return hotel_info
+    
     def create_default_hotel_info(self):
         """Create default hotel information"""
         try:
@@ -88,6 +303,7 @@ class Location:
                 {'type': 'hotel_info'},
                 {'$set': updates}
             )
+            self.hotel_info_provider.invalidate()
             return {
                 'success': result.modified_count > 0,
                 'message': 'Hotel information updated successfully' if result.modified_count > 0 else 'No changes made'
@@ -96,256 +312,273 @@ class Location:
             print(f"Error updating hotel info: {e}")
             return {'success': False, 'message': str(e)}
     
-    def get_nearby_places(self, place_type='tourist_attraction', radius=5000):
-        """Get nearby places using Google Places API"""
-        
-        # If API key is not configured, return mock data
-        if not self.google_api_key or self.google_api_key == 'YOUR_API_KEY_HERE':
-            return self._get_mock_places(place_type)
+    def get_nearby_places(self, place_type='tourist_attraction', radius=5000, hotel_info=None):
+        """Get nearby places using Google Places API.
         
+        Results are cached per (type, radius, hotel coordinates) in memory and
+        in MongoDB. Entries older than PLACES_CACHE_TTL are still served, and a
+        background refresh is started, until PLACES_CACHE_MAX_STALE. Places
+        are sorted nearest first.
+        """
         try:
-            hotel_info = self.get_hotel_info()
-            if not hotel_info or 'coordinates' not in hotel_info:
-                return self._get_mock_places(place_type)
+            hotel_info = hotel_info or self.get_hotel_info()
+            coordinates = hotel_info.get('coordinates') if hotel_info else None
             
-            # Map place types to Google Places API types
-            google_place_types = {
-                'tourist_attraction': 'tourist_attraction',
-                'restaurant': 'restaurant',
-                'shopping_mall': 'shopping_mall',
-                'hospital': 'hospital',
-                'bank': 'bank',
-                'gas_station': 'gas_station',
-                'pharmacy': 'pharmacy'
-            }
+            # If API key is not configured, return mock data
+            if not self.google_api_key or self.google_api_key == 'YOUR_API_KEY_HERE':
+                return self._get_mock_places(place_type, coordinates, radius)
             
-            google_type = google_place_types.get(place_type, 'tourist_attraction')
-            coordinates = hotel_info['coordinates']
+            if not coordinates:
+                return self._get_mock_places(place_type)
             
-            # Google Places Nearby Search API
-            url = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
-            params = {
-                'location': f"{coordinates['latitude']},{coordinates['longitude']}",
-                'radius': radius,
-                'type': google_type,
-                'key': self.google_api_key
-            }
+            key = self._places_cache_key(place_type, radius, coordinates)
+            entry = self._read_places_cache(key)
             
-            response = requests.get(url, params=params)
+            if entry:
+                age = (datetime.utcnow() - entry['fetched_at']).total_seconds()
+                if age >= Config.PLACES_CACHE_TTL:
+                    self._schedule_places_refresh(key, place_type, radius, coordinates)
+                return entry['places'][:NEARBY_RESULT_LIMIT]
             
-            if response.status_code == 200:
-                data = response.json()
-                places = []
-                
-                for place in data.get('results', [])[:10]:  # Limit to 10 results
-                    place_info = {
-                        'name': place.get('name', 'Unknown'),
-                        'address': place.get('vicinity', 'Address not available'),
-                        'rating': place.get('rating', 0),
-                        'type': place_type.replace('_', ' ').title(),
-                        'coordinates': {
-                            'lat': place['geometry']['location']['lat'],
-                            'lng': place['geometry']['location']['lng']
-                        },
-                        'place_id': place.get('place_id', ''),
-                        'photo_reference': place.get('photos', [{}])[0].get('photo_reference', '') if place.get('photos') else '',
-                        'price_level': place.get('price_level', 0),
-                        'user_ratings_total': place.get('user_ratings_total', 0)
-                    }
-                    
-                    # Calculate distance (simple approximation)
-                    distance = self._calculate_distance(
-                        coordinates['latitude'], coordinates['longitude'],
-                        place['geometry']['location']['lat'], place['geometry']['location']['lng']
-                    )
-                    place_info['distance'] = f"{distance:.1f} miles"
-                    
-                    places.append(place_info)
-                
+            places = self._nearby_from_wide_search(place_type, radius, coordinates)
+            if places is not None:
                 return places
-            else:
-                print(f"Google Places API error: {response.status_code}")
-                return self._get_mock_places(place_type)
+            
+            places = self._fetch_nearby_places(place_type, radius, coordinates)
+            if places is None:
+                return self._get_mock_places(place_type, coordinates, radius)
+            
+            self._write_places_cache(key, places)
+            return places[:NEARBY_RESULT_LIMIT]
                 
         except Exception as e:
             print(f"Error fetching nearby places: {e}")
             return self._get_mock_places(place_type)
     
-    def _calculate_distance(self, lat1, lon1, lat2, lon2):
-        """Calculate distance between two coordinates in miles"""
-        import math
+    def get_nearby_places_bulk(self, place_types, radius=5000, hotel_info=None):
+        """Get the first page of nearby places for several types concurrently; returns {type: places}"""
+        hotel_info = hotel_info or self.get_hotel_info()
+        with ThreadPoolExecutor(max_workers=len(place_types) or 1) as executor:
+            futures = {
+                place_type: executor.submit(self.find_nearby_places, place_type, radius, 1, hotel_info)
+                for place_type in place_types
+            }
+            return {place_type: future.result()['places'] for place_type, future in futures.items()}
+    
+    def find_nearby_places(self, place_type, radius=5000, page=1, hotel_info=None):
+        """Get one page of nearby places, nearest first, from the local places store.
         
-        # Haversine formula
-        R = 3959  # Earth's radius in miles
+        Only when nothing of this type has been stored yet does it fall back
+        to get_nearby_places (live or mock), which also fills the store. When
+        the live results for this type and area are older than PLACES_CACHE_TTL
+        the store is refreshed in the background.
+        """
+        hotel_info = hotel_info or self.get_hotel_info()
+        coordinates = hotel_info.get('coordinates') if hotel_info else None
         
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lat = math.radians(lat2 - lat1)
-        delta_lon = math.radians(lon2 - lon1)
+        if coordinates:
+            try:
+                places, has_next = self.place_store.find_nearby(
+                    place_type, coordinates['latitude'], coordinates['longitude'], radius,
+                    limit=NEARBY_RESULT_LIMIT, skip=(page - 1) * NEARBY_RESULT_LIMIT
+                )
+                if places or page > 1 or self.place_store.has_places(place_type):
+                    if page == 1:
+                        self._refresh_stale_places(place_type, radius, coordinates)
+                    return {'places': places, 'page': page, 'has_next': has_next, 'source': 'local'}
+            except Exception as e:
+                print(f"Error querying local places: {e}")
         
-        a = (math.sin(delta_lat / 2) ** 2 +
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+        places = self.get_nearby_places(place_type, radius, hotel_info) if page == 1 else []
+        return {'places': places, 'page': page, 'has_next': False, 'source': 'live'}
+    
+    def _refresh_stale_places(self, place_type, radius, coordinates):
+        """Refetch places for the store if the last live fetch for this area is missing or old.
+        
+        The wide search covers every smaller radius, so it is the one refreshed.
+        """
+        if not self.google_api_key or self.google_api_key == 'YOUR_API_KEY_HERE':
+            return
         
-        return R * c
+        radius = max(radius, WIDE_SEARCH_RADIUS)
+        key = self._places_cache_key(place_type, radius, coordinates)
+        entry = self._read_places_cache(key)
+        if not entry or (datetime.utcnow() - entry['fetched_at']).total_seconds() >= Config.PLACES_CACHE_TTL:
+            self._schedule_places_refresh(key, place_type, radius, coordinates)
     
-    def _get_mock_places(self, place_type):
-        """Return mock data when Google API is not available"""
-        mock_places = {
-            'tourist_attraction': [
-                {
-                    'name': 'Times Square',
-                    'address': 'Times Square, New York, NY 10036',
-                    'distance': '0.1 miles',
-                    'rating': 4.2,
-                    'type': 'Tourist Attraction',
-                    'coordinates': {'lat': 40.7580, 'lng': -73.9855}
-                },
-                {
-                    'name': 'Broadway Theater District',
-                    'address': 'Broadway, New York, NY 10036',
-                    'distance': '0.2 miles',
-                    'rating': 4.8,
-                    'type': 'Entertainment District',
-                    'coordinates': {'lat': 40.7590, 'lng': -73.9845}
-                },
-                {
-                    'name': 'Empire State Building',
-                    'address': '350 5th Ave, New York, NY 10118',
-                    'distance': '0.6 miles',
-                    'rating': 4.5,
-                    'type': 'Landmark',
-                    'coordinates': {'lat': 40.7484, 'lng': -73.9857}
-                },
-                {
-                    'name': 'Central Park',
-                    'address': 'Central Park, New York, NY 10024',
-                    'distance': '0.8 miles',
-                    'rating': 4.7,
-                    'type': 'Park',
-                    'coordinates': {'lat': 40.7829, 'lng': -73.9654}
-                },
-                {
-                    'name': 'Rockefeller Center',
-                    'address': '45 Rockefeller Plaza, New York, NY 10111',
-                    'distance': '0.4 miles',
-                    'rating': 4.6,
-                    'type': 'Tourist Attraction',
-                    'coordinates': {'lat': 40.7587, 'lng': -73.9787}
-                }
-            ],
-            'restaurant': [
-                {
-                    'name': 'Carmines',
-                    'address': '200 W 44th St, New York, NY 10036',
-                    'distance': '0.1 miles',
-                    'rating': 4.4,
-                    'type': 'Italian Restaurant',
-                    'coordinates': {'lat': 40.7589, 'lng': -73.9851}
-                },
-                {
-                    'name': 'Juniors Restaurant',
-                    'address': '386 Flatbush Ave Ext, Brooklyn, NY 11201',
-                    'distance': '0.2 miles',
-                    'rating': 4.3,
-                    'type': 'American Restaurant',
-                    'coordinates': {'lat': 40.7580, 'lng': -73.9840}
-                },
-                {
-                    'name': 'The View Restaurant',
-                    'address': '1535 Broadway, New York, NY 10036',
-                    'distance': '0.1 miles',
-                    'rating': 4.2,
-                    'type': 'American Fine Dining',
-                    'coordinates': {'lat': 40.7582, 'lng': -73.9856}
-                },
-                {
-                    'name': 'Blue Fin',
-                    'address': '1567 Broadway, New York, NY 10036',
-                    'distance': '0.1 miles',
-                    'rating': 4.1,
-                    'type': 'Seafood Restaurant',
-                    'coordinates': {'lat': 40.7590, 'lng': -73.9850}
-                },
-                {
-                    'name': "Joe Allen Restaurant",
-                    'address': '326 W 46th St, New York, NY 10036',
-                    'distance': '0.2 miles',
-                    'rating': 4.3,
-                    'type': 'American Bistro',
-                    'coordinates': {'lat': 40.7595, 'lng': -73.9870}
-                }
-            ],
-            'shopping_mall': [
-                {
-                    'name': 'Times Square Tower',
-                    'address': '7 Times Square, New York, NY 10036',
-                    'distance': '0.1 miles',
-                    'rating': 4.2,
-                    'type': 'Shopping Center',
-                    'coordinates': {'lat': 40.7580, 'lng': -73.9855}
-                },
-                {
-                    'name': "Macy's Herald Square",
-                    'address': '151 W 34th St, New York, NY 10001',
-                    'distance': '0.7 miles',
-                    'rating': 4.1,
-                    'type': 'Department Store',
-                    'coordinates': {'lat': 40.7505, 'lng': -73.9934}
-                },
-                {
-                    'name': 'Bryant Park Shops',
-                    'address': 'Bryant Park, New York, NY 10018',
-                    'distance': '0.3 miles',
-                    'rating': 4.3,
-                    'type': 'Shopping District',
-                    'coordinates': {'lat': 40.7536, 'lng': -73.9832}
-                },
-                {
-                    'name': 'The Shops at Columbus Circle',
-                    'address': '10 Columbus Cir, New York, NY 10019',
-                    'distance': '0.9 miles',
-                    'rating': 4.4,
-                    'type': 'Shopping Mall',
-                    'coordinates': {'lat': 40.7681, 'lng': -73.9819}
-                }
-            ]
+    def _nearby_from_wide_search(self, place_type, radius, coordinates):
+        """Filter a cached wide-radius result set down to radius, or None if there is none"""
+        if radius >= WIDE_SEARCH_RADIUS:
+            return None
+        
+        entry = self._read_places_cache(self._places_cache_key(place_type, WIDE_SEARCH_RADIUS, coordinates))
+        if not entry:
+            return None
+        
+        return sort_by_distance(entry['places'], coordinates['latitude'], coordinates['longitude'],
+                                radius / METERS_PER_MILE, NEARBY_RESULT_LIMIT)
+    
+    def _places_cache_key(self, place_type, radius, coordinates):
+        return f"{place_type}:{radius}:{coordinates['latitude']:.5f},{coordinates['longitude']:.5f}"
+    
+    def _read_places_cache(self, key):
+        """Read a cached places entry from memory, falling back to MongoDB"""
+        entry = places_cache.get(key)
+        if entry:
+            return entry
+        
+        entry = self.places_collection.find_one({'_id': key}, {'places': 1, 'fetched_at': 1})
+        if entry:
+            entry = {'places': entry['places'], 'fetched_at': entry['fetched_at']}
+            places_cache.set(key, entry)
+        return entry
+    
+    def _write_places_cache(self, key, places):
+        entry = {'places': places, 'fetched_at': datetime.utcnow()}
+        places_cache.set(key, entry)
+        try:
+            self.places_collection.replace_one({'_id': key}, dict(entry, _id=key), upsert=True)
+        except Exception as e:
+            print(f"Error persisting places cache: {e}")
+    
+    def _schedule_places_refresh(self, key, place_type, radius, coordinates):
+        """Refresh a stale entry in the background, at most once at a time per key"""
+        with _refreshing_lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+        
+        def refresh():
+            try:
+                places = self._fetch_nearby_places(place_type, radius, coordinates)
+                if places is not None:
+                    self._write_places_cache(key, places)
+            except Exception as e:
+                print(f"Error refreshing nearby places: {e}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+        
+        _refresh_executor.submit(refresh)
+    
+    def _fetch_nearby_places(self, place_type, radius, coordinates):
+        """Call Google Places Nearby Search; returns None if the call fails or the circuit is open"""
+        google_type = GOOGLE_PLACE_TYPES.get(place_type, 'tourist_attraction')
+        
+        # Google Places Nearby Search API
+        url = f"{self.places_api_url}/nearbysearch/json"
+        params = {
+            'location': f"{coordinates['latitude']},{coordinates['longitude']}",
+            'radius': radius,
+            'type': google_type,
+            'key': self.google_api_key
         }
         
-        return mock_places.get(place_type, [])
+        try:
+            data = self.http.get_json('nearbysearch', url, params)
+        except CircuitOpenError:
+            return None
+        except UpstreamError as e:
+            print(f"Google Places API error: {e.status_code}")
+            return None
+        
+        # Errors come back as HTTP 200 with an empty result list; don't cache or store them
+        if data.get('status') not in PLACES_OK_STATUSES:
+            print(f"Google Places API status: {data.get('status')} {data.get('error_message', '')}".rstrip())
+            return None
+        
+        places = []
+        
+        # Keep every result so smaller radii can be answered from this set
+        for place in data.get('results', []):
+            place_info = {
+                'name': place.get('name', 'Unknown'),
+                'address': place.get('vicinity', 'Address not available'),
+                'rating': place.get('rating', 0),
+                'type': place_type.replace('_', ' ').title(),
+                'coordinates': {
+                    'lat': place['geometry']['location']['lat'],
+                    'lng': place['geometry']['location']['lng']
+                },
+                'place_id': place.get('place_id', ''),
+                'photo_reference': place.get('photos', [{}])[0].get('photo_reference', '') if place.get('photos') else '',
+                'price_level': place.get('price_level', 0),
+                'user_ratings_total': place.get('user_ratings_total', 0)
+            }
+            places.append(place_info)
+        
+        # Distances for the whole result set in one vectorized pass
+        places = sort_by_distance(places, coordinates['latitude'], coordinates['longitude'])
+        
+        try:
+            self.place_store.upsert_places(place_type, places)
+        except Exception as e:
+            print(f"Error storing places locally: {e}")
+        
+        return places
+    
+    def _get_mock_places(self, place_type, coordinates=None, radius=None):
+        """Return mock data when Google API is not available.
+        
+        With hotel coordinates, distances are computed and places sorted
+        (and limited to radius meters, if given).
+        """
+        if not coordinates:
+            return copy.deepcopy(MOCK_PLACES.get(place_type, []))
+        
+        radius_miles = radius / METERS_PER_MILE if radius else None
+        return MOCK_PLACE_SETS.get(place_type, EMPTY_PLACE_SET).nearby(
+            coordinates['latitude'], coordinates['longitude'], radius_miles, NEARBY_RESULT_LIMIT
+        )
     
     def get_place_photo_url(self, photo_reference, max_width=400):
         """Get Google Places photo URL"""
         if not photo_reference or not self.google_api_key or self.google_api_key == 'YOUR_API_KEY_HERE':
             return None
         
-        return f"https://maps.googleapis.com/maps/api/place/photo?maxwidth={max_width}&photoreference={photo_reference}&key={self.google_api_key}"
+        return f"{self.places_api_url}/photo?maxwidth={max_width}&photoreference={photo_reference}&key={self.google_api_key}"
     
     def get_place_details(self, place_id):
-        """Get detailed information about a place"""
+        """Get detailed information about a place (cached per place_id)"""
         if not place_id or not self.google_api_key or self.google_api_key == 'YOUR_API_KEY_HERE':
             return None
         
+        details = place_details_cache.get(place_id)
+        if details is not None:
+            return details
+        
+        try:
+            return _place_details_flight.do(place_id, lambda: self._fetch_place_details(place_id))
+        except Exception as e:
+            print(f"Error fetching place details: {e}")
+            return None
+    
+    def _fetch_place_details(self, place_id):
+        """Call Google Place Details and cache a successful result"""
+        # Another request may have filled the cache while this one queued
+        details = place_details_cache.get(place_id)
+        if details is not None:
+            return details
+        
         try:
-            url = 'https://maps.googleapis.com/maps/api/place/details/json'
+            url = f"{self.places_api_url}/details/json"
             params = {
                 'place_id': place_id,
                 'fields': 'name,formatted_address,formatted_phone_number,website,opening_hours,reviews,photos,rating,price_level',
                 'key': self.google_api_key
             }
             
-            response = requests.get(url, params=params)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('result', {})
-            else:
-                print(f"Google Place Details API error: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            print(f"Error fetching place details: {e}")
+            data = self.http.get_json('details', url, params)
+        except CircuitOpenError:
+            return None
+        except UpstreamError as e:
+            print(f"Google Place Details API error: {e.status_code}")
             return None
+        
+        details = data.get('result', {})
+        if details:
+            place_details_cache.set(place_id, details)
+        return details
     
     def get_directions_url(self, destination_address=None):
         """Generate Google Maps directions URL"""
@@ -362,6 +595,5 @@ class Location:
             return f"https://www.google.com/maps/place/{hotel_address.replace(' ', '+')}"
     
     def close_connection(self):
-        """Close MongoDB connection"""
-        if hasattr(self, 'client'):
-            self.client.close()
+        """Kept for compatibility; the shared client stays open for reuse"""
+        pass
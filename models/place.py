@@ -0,0 +1,101 @@
+from pymongo import IndexModel, UpdateOne, ASCENDING, GEOSPHERE
+from datetime import datetime
+from models.database import Database
+from utils.geo import METERS_PER_MILE
+
+class Place:
+    """Local store of nearby places, queried with $geoNear.
+
+    Filled from Google Places results as they are fetched and by the
+    ``import-places`` command, so nearby lookups need no API call.
+    """
+    INDEXES = {
+        'places': [
+            IndexModel([('location', GEOSPHERE), ('place_type', ASCENDING)], name='location_place_type'),
+            IndexModel([('place_type', ASCENDING)], name='place_type')
+        ]
+    }
+
+    @property
+    def db(self):
+        return Database().db
+
+    @property
+    def collection(self):
+        return self.db.places
+
+    def upsert_places(self, place_type, places, source='google'):
+        """Insert or refresh places of one type; returns the number written"""
+        now = datetime.utcnow()
+        operations = []
+        for place in places:
+            lat, lng = place['coordinates']['lat'], place['coordinates']['lng']
+            place_key = place.get('place_id') or f"{place['name']}@{lat:.5f},{lng:.5f}"
+            operations.append(UpdateOne(
+                {'_id': f"{place_type}:{place_key}"},
+                {
+                    '$set': {
+                        'place_type': place_type,
+                        'name': place.get('name', 'Unknown'),
+                        'address': place.get('address', 'Address not available'),
+                        'rating': place.get('rating', 0),
+                        'type': place.get('type', place_type.replace('_', ' ').title()),
+                        'location': {'type': 'Point', 'coordinates': [lng, lat]},
+                        'place_id': place.get('place_id', ''),
+                        'photo_reference': place.get('photo_reference', ''),
+                        'price_level': place.get('price_level', 0),
+                        'user_ratings_total': place.get('user_ratings_total', 0),
+                        'source': source,
+                        'updated_at': now
+                    },
+                    '$setOnInsert': {'created_at': now}
+                },
+                upsert=True
+            ))
+
+        if not operations:
+            return 0
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def find_nearby(self, place_type, latitude, longitude, radius, limit=10, skip=0):
+        """Places of a type within radius meters, nearest first.
+
+        Returns (places, has_next); one extra document is read to tell
+        whether another page exists.
+        """
+        pipeline = [
+            {'$geoNear': {
+                'near': {'type': 'Point', 'coordinates': [longitude, latitude]},
+                'distanceField': 'distance_meters',
+                'maxDistance': radius,
+                'query': {'place_type': place_type},
+                'spherical': True
+            }},
+            {'$skip': skip},
+            {'$limit': limit + 1}
+        ]
+        docs = list(self.collection.aggregate(pipeline))
+        return [self._to_place(doc) for doc in docs[:limit]], len(docs) > limit
+
+    def has_places(self, place_type):
+        """Whether any place of this type has been stored"""
+        return self.collection.find_one({'place_type': place_type}, {'_id': 1}) is not None
+
+    def _to_place(self, doc):
+        """Convert a stored document to the nearby-places response shape"""
+        lng, lat = doc['location']['coordinates']
+        distance_miles = doc['distance_meters'] / METERS_PER_MILE
+        return {
+            'name': doc['name'],
+            'address': doc['address'],
+            'rating': doc['rating'],
+            'type': doc['type'],
+            'coordinates': {'lat': lat, 'lng': lng},
+            'place_id': doc.get('place_id', ''),
+            'photo_reference': doc.get('photo_reference', ''),
+            'price_level': doc.get('price_level', 0),
+            'user_ratings_total': doc.get('user_ratings_total', 0),
+            'distance_miles': round(distance_miles, 2),
+            'distance': f"{distance_miles:.1f} miles"
+        }
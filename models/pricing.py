@@ -0,0 +1,242 @@
+from bson.objectid import ObjectId
+from datetime import date, datetime
+from config import Config
+import threading
+import time
+import numpy as np
+from models.database import Database
+from models.availability import OCCUPANCY_HORIZON_MONTHS, months_ahead, to_ordinal
+from models.room import room_change_listeners
+from utils.cache import CacheNamespace
+
+RULE_KINDS = ('weekend', 'season', 'length_of_stay')
+
+# Nights priced as weekend nights unless a rule says otherwise (Friday, Saturday)
+DEFAULT_WEEKEND_NIGHTS = [4, 5]
+
+# Active rules in the form the engine compiles; the version stamps compiled tables
+pricing_rules_cache = CacheNamespace('pricing_rules', ttl=Config.PRICING_RULES_CACHE_TTL)
+
+
+def compile_rates(base_price, rules, start, days):
+    """Nightly rates for ``days`` nights from day ordinal ``start``.
+
+    Weekend and season multipliers stack; length-of-stay discounts apply to
+    whole stays and are left to the caller.
+    """
+    nights = np.arange(start, start + days)
+    rates = np.full(days, float(base_price))
+    # Ordinal 1 (0001-01-01) is a Monday
+    weekdays = (nights - 1) % 7
+    for rule in rules:
+        if rule['kind'] == 'weekend':
+            rates[np.isin(weekdays, rule['nights'])] *= rule['multiplier']
+        elif rule['kind'] == 'season':
+            rates[(nights >= rule['start']) & (nights < rule['end'])] *= rule['multiplier']
+    return np.round(rates, 2)
+
+
+class RateTable:
+    """Compiled nightly rates of one room over the pricing horizon.
+
+    ``sums[i]`` is the total of the first ``i`` nights, so any stay inside
+    the horizon costs one subtraction; stays outside it are compiled on the
+    fly for just their nights.
+    """
+
+    def __init__(self, base_price, rules, origin, days):
+        self.base_price = float(base_price)
+        self.rules = rules
+        self.origin = origin
+        self.rates = compile_rates(base_price, rules, origin, days)
+        self.sums = np.concatenate(([0.0], np.cumsum(self.rates)))
+        # Best discount first
+        self.stay_discounts = sorted(
+            (rule for rule in rules if rule['kind'] == 'length_of_stay'),
+            key=lambda rule: rule['discount'], reverse=True
+        )
+
+    def nightly(self, start, end):
+        """(rates array, subtotal) for the nights [start, end)"""
+        first, last = start - self.origin, end - self.origin
+        if first < 0 or last > len(self.rates):
+            rates = compile_rates(self.base_price, self.rules, start, end - start)
+            return rates, float(rates.sum())
+        return self.rates[first:last], float(self.sums[last] - self.sums[first])
+
+    def stay_discount(self, nights):
+        """The length-of-stay rule with the best discount that applies, or None"""
+        for rule in self.stay_discounts:
+            if nights >= rule['min_nights']:
+                return rule
+        return None
+
+
+class PricingEngine:
+    """Prices stays from per-room rate tables compiled from the pricing rules.
+
+    Tables are built on first use and kept until the rules version, the
+    room's base price or the day changes; room writes drop the room's table.
+    Tables are also rebuilt once older than the rules cache TTL, since with
+    the memory cache backend a rule change made in another worker does not
+    bump this worker's rules version.
+    """
+
+    def __init__(self, rules_loader):
+        self.rules_loader = rules_loader
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _table(self, room_id, base_price):
+        today = date.today().toordinal()
+        stamp = (pricing_rules_cache.version(), float(base_price), today)
+        with self._lock:
+            entry = self._tables.get(room_id)
+        if entry is not None and entry[0] == stamp:
+            if time.monotonic() - entry[2] < Config.PRICING_RULES_CACHE_TTL:
+                return entry[1]
+
+        rules = [
+            rule for rule in pricing_rules_cache.get_or_load('active', self.rules_loader)
+            if not rule['room_ids'] or room_id in rule['room_ids']
+        ]
+        table = RateTable(base_price, rules, today, months_ahead(today, OCCUPANCY_HORIZON_MONTHS) - today)
+        with self._lock:
+            self._tables[room_id] = (stamp, table, time.monotonic())
+        return table
+
+    def quote(self, room, check_in, check_out):
+        """Nightly rates, subtotal, length-of-stay discount and total for a stay in a room"""
+        start, end = to_ordinal(check_in), to_ordinal(check_out)
+        nights = max(end - start, 0)
+        table = self._table(str(room['_id']), room['price'])
+        rates, subtotal = table.nightly(start, start + nights)
+
+        rule = table.stay_discount(nights)
+        discount = round(subtotal * rule['discount'], 2) if rule else 0.0
+        return {
+            'nights': nights,
+            'price_per_night': table.base_price,
+            'nightly': [
+                {'date': date.fromordinal(start + i).isoformat(), 'rate': float(rate)}
+                for i, rate in enumerate(rates)
+            ],
+            'subtotal': round(subtotal, 2),
+            'discount': discount,
+            'discount_rule': rule['name'] if rule else None,
+            'total': round(subtotal - discount, 2)
+        }
+
+    def room_changed(self, room_id, room):
+        with self._lock:
+            self._tables.pop(str(room_id), None)
+
+    def invalidate(self):
+        with self._lock:
+            self._tables.clear()
+
+
+class PricingRule:
+    """Weekend, season and length-of-stay pricing rules.
+
+    ``weekend``: ``nights`` (weekday numbers, Monday = 0) priced at ``multiplier``.
+    ``season``: nights from ``start`` up to ``end`` (exclusive) priced at ``multiplier``.
+    ``length_of_stay``: stays of at least ``min_nights`` get ``discount`` (0-1) off.
+    Rules apply to every room unless ``room_ids`` lists some.
+    """
+
+    @property
+    def db(self):
+        return Database().db
+
+    @property
+    def collection(self):
+        return self.db.pricing_rules
+
+    def create_rule(self, kind, name, room_ids=None, **params):
+        """Validate and store a rule; returns the new rule id"""
+        try:
+            rule = self._validate(kind, name, room_ids or [], params)
+            rule['active'] = True
+            rule['created_at'] = datetime.utcnow()
+            result = self.collection.insert_one(rule)
+            pricing_rules_cache.invalidate()
+            return {'success': True, 'rule_id': str(result.inserted_id)}
+        except (KeyError, TypeError, ValueError) as e:
+            return {'success': False, 'message': f'Invalid pricing rule: {e}'}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
+    def _validate(self, kind, name, room_ids, params):
+        if kind not in RULE_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(RULE_KINDS)}")
+        if not all(ObjectId.is_valid(room_id) for room_id in room_ids):
+            raise ValueError('room_ids must be room ids')
+        rule = {'kind': kind, 'name': name or kind.replace('_', ' ').title(), 'room_ids': [str(r) for r in room_ids]}
+
+        if kind == 'length_of_stay':
+            rule['min_nights'] = int(params['min_nights'])
+            rule['discount'] = float(params['discount'])
+            if rule['min_nights'] < 1 or not 0 < rule['discount'] < 1:
+                raise ValueError('min_nights must be at least 1 and discount between 0 and 1')
+            return rule
+
+        rule['multiplier'] = float(params['multiplier'])
+        if rule['multiplier'] <= 0:
+            raise ValueError('multiplier must be positive')
+        if kind == 'weekend':
+            rule['nights'] = sorted({int(night) for night in params.get('nights', DEFAULT_WEEKEND_NIGHTS)})
+            if not all(0 <= night <= 6 for night in rule['nights']):
+                raise ValueError('nights must be weekday numbers 0-6')
+        else:
+            rule['start'] = datetime.strptime(params['start'], '%Y-%m-%d')
+            rule['end'] = datetime.strptime(params['end'], '%Y-%m-%d')
+            if rule['start'] >= rule['end']:
+                raise ValueError('end must be after start')
+        return rule
+
+    def get_rules(self):
+        """Get every rule, newest first"""
+        try:
+            rules = list(self.collection.find().sort('created_at', -1))
+            for rule in rules:
+                rule['_id'] = str(rule['_id'])
+            return {'success': True, 'rules': rules}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
+    def set_rule_active(self, rule_id, active):
+        """Enable or disable a rule"""
+        try:
+            result = self.collection.update_one({'_id': ObjectId(rule_id)}, {'$set': {'active': bool(active)}})
+            if result.matched_count:
+                pricing_rules_cache.invalidate()
+                return {'success': True}
+            return {'success': False, 'message': 'Pricing rule not found'}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
+    def delete_rule(self, rule_id):
+        """Delete a rule"""
+        try:
+            result = self.collection.delete_one({'_id': ObjectId(rule_id)})
+            if result.deleted_count:
+                pricing_rules_cache.invalidate()
+                return {'success': True}
+            return {'success': False, 'message': 'Pricing rule not found'}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+
+    def load_active_rules(self):
+        """Active rules with season dates as day ordinals, for the engine"""
+        rules = []
+        for rule in self.collection.find({'active': True}):
+            rule['_id'] = str(rule['_id'])
+            if rule['kind'] == 'season':
+                rule['start'], rule['end'] = to_ordinal(rule['start']), to_ordinal(rule['end'])
+            rules.append(rule)
+        return rules
+
+
+pricing_engine = PricingEngine(lambda: PricingRule().load_active_rules())
+room_change_listeners.append(pricing_engine.room_changed)
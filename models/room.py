@@ -1,47 +1,234 @@
-from pymongo import MongoClient
 from bson.objectid import ObjectId
+from pymongo import IndexModel, InsertOne, UpdateOne, ReturnDocument, ASCENDING
+from pymongo.errors import BulkWriteError
 from datetime import datetime
-import os
+from itertools import islice
+import math
+from config import Config
+from models.database import Database
+from models.amenity_index import AmenityFacetIndex
+from utils.cache import CacheNamespace
+
+# Room catalog cache, invalidated by every room write
+room_cache = CacheNamespace('rooms', ttl=Config.ROOM_CACHE_TTL)
+amenity_index = AmenityFacetIndex()
+
+# Called with (room_id, room or None) after every room write
+room_change_listeners = []
+
+# Values read as "true" in the available column of a room import
+TRUE_VALUES = ('true', '1', 'yes', 'y')
+
+
+def room_price(price):
+    """price as a float; raises ValueError unless it is a positive, finite number"""
+    price = float(price)
+    if not math.isfinite(price) or price <= 0:
+        raise ValueError('price must be a positive number')
+    return price
+
+
+def parse_room_row(row):
+    """Validate one imported room (CSV strings or JSON values).
+    
+    Returns (room_id, fields): room_id is None for a new room, which needs
+    name, price and capacity; for an existing room only the given (non-empty)
+    fields are changed. Amenities in CSV are separated by semicolons.
+    Raises ValueError with a message for the row report.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+    values = {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+    room_id = values.pop('room_id', None)
+    if room_id is not None and not ObjectId.is_valid(str(room_id)):
+        raise ValueError('Invalid room_id')
+    
+    fields = {}
+    for field in ('name', 'description', 'image_url'):
+        if field in values:
+            fields[field] = str(values[field]).strip()
+    try:
+        if 'price' in values:
+            fields['price'] = float(values['price'])
+        if 'capacity' in values:
+            fields['capacity'] = int(values['capacity'])
+    except (TypeError, ValueError):
+        raise ValueError('price must be a number and capacity a whole number')
+    if 'price' in fields:
+        fields['price'] = room_price(fields['price'])
+    if fields.get('capacity', 1) < 1:
+        raise ValueError('capacity must be at least 1')
+    if 'amenities' in values:
+        amenities = values['amenities']
+        if isinstance(amenities, str):
+            amenities = amenities.split(';')
+        fields['amenities'] = [str(amenity).strip() for amenity in amenities if str(amenity).strip()]
+    if 'available' in values:
+        available = values['available']
+        fields['available'] = available if isinstance(available, bool) else str(available).strip().lower() in TRUE_VALUES
+    
+    if room_id is None and not all(field in fields for field in ('name', 'price', 'capacity')):
+        raise ValueError('New rooms need name, price and capacity')
+    if room_id is not None and not fields:
+        raise ValueError('Nothing to update')
+    return (str(room_id) if room_id is not None else None), fields
 
 class Room:
+    INDEXES = {
+        'rooms': [
+            IndexModel([('available', ASCENDING), ('price', ASCENDING)], name='available_price'),
+            IndexModel([('amenities', ASCENDING)], name='amenities')
+        ]
+    }
+    
     def __init__(self):
-        self.db = self._get_database()
-        self.collection = self.db.rooms
-        
-    def _get_database(self):
-        mongo_uri = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/hotel_booking')
-        client = MongoClient(mongo_uri)
-        return client.get_database()
+        self.cache = room_cache
+        self.amenities = amenity_index
+
+    @property
+    def db(self):
+        return Database().db
+
+    @property
+    def collection(self):
+        return self.db.rooms
     
     def create_room(self, name, description, price, capacity, amenities=None, image_url=None):
         """Create a new room"""
-        if amenities is None:
-            amenities = []
-            
-        room_data = {
+        try:
+            room_data = self._room_document(name, price, capacity, description, amenities, image_url)
+            result = self.collection.insert_one(room_data)
+            self._room_changed(str(result.inserted_id), room_data)
+            return {'success': True, 'room_id': str(result.inserted_id)}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
+    def _room_document(self, name, price, capacity, description='', amenities=None, image_url=None, available=True):
+        """Build the document for a new room"""
+        return {
             'name': name,
             'description': description,
-            'price': float(price),
+            'price': room_price(price),
             'capacity': int(capacity),
-            'amenities': amenities,
+            'amenities': amenities or [],
             'image_url': image_url or '',
-            'available': True,
+            'available': available,
             'created_at': datetime.utcnow()
         }
+    
+    def bulk_create_rooms(self, rooms):
+        """Insert many rooms (dicts of create_room arguments) in one unordered bulk_write"""
+        return self.bulk_write_rooms([(None, room) for room in rooms])
+    
+    def bulk_update_rooms(self, updates):
+        """Apply many (room_id, fields) updates in one unordered bulk_write"""
+        return self.bulk_write_rooms(updates)
+    
+    def bulk_set_prices(self, prices):
+        """Change the price of many rooms from a {room_id: price} mapping"""
+        return self.bulk_write_rooms([(room_id, {'price': price}) for room_id, price in prices.items()])
+    
+    def bulk_set_availability(self, room_ids, available):
+        """Open or close many rooms for booking"""
+        return self.bulk_write_rooms([(room_id, {'available': bool(available)}) for room_id in room_ids])
+    
+    def bulk_write_rooms(self, entries):
+        """Create (room_id None) or update rooms from (room_id, fields) pairs.
         
+        Everything goes to MongoDB in one unordered bulk_write, so a failing
+        room does not stop the rest. Returns one result per entry, in order;
+        caches are invalidated once and listeners notified per changed room.
+        """
+        results = [None] * len(entries)
+        update_ids = {room_id for room_id, _ in entries if room_id is not None and ObjectId.is_valid(room_id)}
         try:
-            result = self.collection.insert_one(room_data)
-            return {'success': True, 'room_id': str(result.inserted_id)}
+            existing = {str(room['_id']) for room in self.collection.find(
+                {'_id': {'$in': [ObjectId(room_id) for room_id in update_ids]}}, {'_id': 1}
+            )} if update_ids else set()
         except Exception as e:
-            return {'success': False, 'message': str(e)}
+            return [{'success': False, 'room_id': room_id, 'message': str(e)} for room_id, _ in entries]
+        
+        operations, positions = [], []
+        now = datetime.utcnow()
+        for position, (room_id, fields) in enumerate(entries):
+            if room_id is None:
+                try:
+                    document = self._room_document(**fields)
+                except (KeyError, TypeError, ValueError) as e:
+                    results[position] = {'success': False, 'room_id': None, 'message': f'Invalid room: {e}'}
+                    continue
+                document['_id'] = ObjectId()
+                operations.append(InsertOne(document))
+                results[position] = {'success': True, 'room_id': str(document['_id']), 'action': 'created'}
+            elif room_id not in existing:
+                results[position] = {'success': False, 'room_id': room_id, 'message': 'Room not found'}
+                continue
+            else:
+                try:
+                    if 'price' in fields:
+                        fields = dict(fields, price=room_price(fields['price']))
+                except (TypeError, ValueError) as e:
+                    results[position] = {'success': False, 'room_id': room_id, 'message': f'Invalid room: {e}'}
+                    continue
+                operations.append(UpdateOne({'_id': ObjectId(room_id)}, {'$set': dict(fields, updated_at=now)}))
+                results[position] = {'success': True, 'room_id': room_id, 'action': 'updated'}
+            positions.append(position)
+        
+        if not operations:
+            return results
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                position = positions[error['index']]
+                results[position] = {'success': False, 'room_id': results[position]['room_id'], 'message': error.get('errmsg')}
+        except Exception as e:
+            for position in positions:
+                results[position] = {'success': False, 'room_id': results[position]['room_id'], 'message': str(e)}
+            return results
+        
+        self._rooms_changed([
+            results[p]['room_id'] for p in positions
+            if results[p]['success'] and results[p]['action'] == 'updated'
+        ])
+        return results
+    
+    def import_rooms(self, rows, batch_size=500):
+        """Validate and write imported rows a batch at a time.
+        
+        Yields a result per row as each batch is written: row number,
+        success, action ('created' or 'updated'), room_id and any message.
+        Rows are validated as they are read, so the input can be a stream.
+        """
+        rows = iter(rows)
+        row_number = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            
+            reports, entries = [], []
+            for row in batch:
+                row_number += 1
+                try:
+                    entries.append(parse_room_row(row))
+                    reports.append((row_number, len(entries) - 1))
+                except ValueError as e:
+                    reports.append((row_number, {'success': False, 'room_id': None, 'message': str(e)}))
+            
+            results = self.bulk_write_rooms(entries)
+            for row, result in reports:
+                if isinstance(result, int):
+                    result = results[result]
+                yield dict(result, row=row)
     
     def get_all_rooms(self, available_only=False):
         """Get all rooms or only available ones"""
         query = {'available': True} if available_only else {}
         try:
-            rooms = list(self.collection.find(query).sort('price', 1))
-            for room in rooms:
-                room['_id'] = str(room['_id'])
+            rooms = self.cache.get_or_load(
+                f'all:{bool(available_only)}', lambda: self._find_rooms(query)
+            )
             return {'success': True, 'rooms': rooms}
         except Exception as e:
             return {'success': False, 'message': str(e)}
@@ -49,9 +236,8 @@ class Room:
     def get_room_by_id(self, room_id):
         """Get room by ID"""
         try:
-            room = self.collection.find_one({'_id': ObjectId(room_id)})
+            room = self.cache.get_or_load(f'id:{room_id}', lambda: self._find_room(room_id))
             if room:
-                room['_id'] = str(room['_id'])
                 return {'success': True, 'room': room}
             return {'success': False, 'message': 'Room not found'}
         except Exception as e:
@@ -66,7 +252,7 @@ class Room:
             if description is not None:
                 update_data['description'] = description
             if price is not None:
-                update_data['price'] = float(price)
+                update_data['price'] = room_price(price)
             if capacity is not None:
                 update_data['capacity'] = int(capacity)
             if amenities is not None:
@@ -78,12 +264,14 @@ class Room:
             
             update_data['updated_at'] = datetime.utcnow()
             
-            result = self.collection.update_one(
+            room = self.collection.find_one_and_update(
                 {'_id': ObjectId(room_id)},
-                {'$set': update_data}
+                {'$set': update_data},
+                return_document=ReturnDocument.AFTER
             )
             
-            if result.modified_count > 0:
+            if room:
+                self._room_changed(room_id, room)
                 return {'success': True, 'message': 'Room updated successfully'}
             return {'success': False, 'message': 'No changes made or room not found'}
         except Exception as e:
@@ -94,13 +282,14 @@ class Room:
         try:
             result = self.collection.delete_one({'_id': ObjectId(room_id)})
             if result.deleted_count > 0:
+                self._room_changed(room_id, None)
                 return {'success': True, 'message': 'Room deleted successfully'}
             return {'success': False, 'message': 'Room not found'}
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
-    def search_rooms(self, min_price=None, max_price=None, min_capacity=None, amenities=None):
-        """Search rooms with filters"""
+    def search_rooms(self, min_price=None, max_price=None, min_capacity=None, amenities=None, amenity_match='any'):
+        """Search rooms with filters; amenity_match is 'any' or 'all' of the amenities"""
         try:
             query = {'available': True}
             
@@ -113,17 +302,69 @@ class Room:
                     query['price'] = {'$lte': float(max_price)}
             if min_capacity is not None:
                 query['capacity'] = {'$gte': int(min_capacity)}
-            if amenities:
-                query['amenities'] = {'$in': amenities}
             
-            rooms = list(self.collection.find(query).sort('price', 1))
-            for room in rooms:
-                room['_id'] = str(room['_id'])
+            cache_key = 'search:' + repr((min_price, max_price, min_capacity))
+            rooms = self.cache.get_or_load(cache_key, lambda: self._find_rooms(query))
+            
+            # Amenity filtering is set algebra on the facet index
+            if amenities:
+                room_ids = self._amenity_index().filter(amenities, amenity_match)
+                rooms = [room for room in rooms if room['_id'] in room_ids]
             
             return {'success': True, 'rooms': rooms}
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
+    def get_amenity_facets(self, room_ids=None):
+        """Get (amenity, room count) pairs, counted within room_ids if given"""
+        return self._amenity_index().facets(room_ids)
+    
+    def _amenity_index(self):
+        """Get the amenity index, rebuilding it if the catalog changed elsewhere"""
+        version = self.cache.version()
+        if not self.amenities.is_current(version):
+            result = self.get_all_rooms(available_only=True)
+            if result['success']:
+                self.amenities.rebuild(result['rooms'], version)
+        return self.amenities
+    
+    def _room_changed(self, room_id, room):
+        """Invalidate cached catalog reads, patch the amenity index and notify listeners"""
+        version = self.cache.invalidate()
+        if room is None:
+            self.amenities.apply(room_id, None, False, version - 1, version)
+        else:
+            self.amenities.apply(room_id, room.get('amenities'), room.get('available', True), version - 1, version)
+        for listener in room_change_listeners:
+            listener(room_id, room)
+    
+    def _rooms_changed(self, updated_ids):
+        """Invalidate once after a bulk write and notify listeners of the updated rooms.
+        
+        The amenity index sees the new catalog version and rebuilds on next
+        use; new rooms have no bookings or rate tables for listeners to fix.
+        """
+        self.cache.invalidate()
+        if not room_change_listeners or not updated_ids:
+            return
+        for room in self.collection.find({'_id': {'$in': [ObjectId(room_id) for room_id in set(updated_ids)]}}):
+            for listener in room_change_listeners:
+                listener(str(room['_id']), room)
+    
+    def _find_rooms(self, query):
+        """Load rooms matching a query from MongoDB, cheapest first"""
+        rooms = list(self.collection.find(query).sort('price', 1))
+        for room in rooms:
+            room['_id'] = str(room['_id'])
+        return rooms
+    
+    def _find_room(self, room_id):
+        """Load a single room from MongoDB"""
+        room = self.collection.find_one({'_id': ObjectId(room_id)})
+        if room:
+            room['_id'] = str(room['_id'])
+        return room
+    
     def get_room_count(self):
         """Get total room count"""
         try:
@@ -178,10 +419,7 @@ class Room:
             }
         ]
         
-        created_count = 0
-        for room_data in sample_rooms:
-            result = self.create_room(**room_data)
-            if result['success']:
-                created_count += 1
+        results = self.bulk_create_rooms(sample_rooms)
+        created_count = sum(1 for result in results if result['success'])
         
         return {'success': True, 'created': created_count, 'total': len(sample_rooms)}
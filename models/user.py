@@ -1,55 +1,192 @@
-from pymongo import MongoClient
-from werkzeug.security import generate_password_hash, check_password_hash
+from pymongo import IndexModel, ASCENDING
+from pymongo.collation import Collation
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from bson.objectid import ObjectId
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from werkzeug.security import generate_password_hash
 from datetime import datetime
-import os
+from config import Config
+from models.database import Database
+from utils.cache import CacheNamespace
+from utils.auth import PasswordHasher, RateLimiter, HashPoolBusy
 
-class Database:
-    _instance = None
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Database, cls).__new__(cls)
-            mongo_uri = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/hotel_booking')
-            cls._instance.client = MongoClient(mongo_uri)
-            cls._instance.db = cls._instance.client.get_database()
-        return cls._instance
+# Shared by every request in the process
+password_hasher = PasswordHasher(
+    method=Config.PASSWORD_HASH_METHOD,
+    workers=Config.AUTH_HASH_WORKERS,
+    max_queue=Config.AUTH_HASH_QUEUE
+)
+# User documents without the password hash, for per-request authorization
+principal_cache = CacheNamespace('principals', ttl=Config.PRINCIPAL_CACHE_TTL)
+
+login_ip_limiter = RateLimiter(Config.LOGIN_IP_PER_MINUTE / 60, Config.LOGIN_IP_BURST)
+login_email_limiter = RateLimiter(Config.LOGIN_EMAIL_PER_MINUTE / 60, Config.LOGIN_EMAIL_BURST)
+
+# Emails compare case-insensitively; lookups must pass this to use the unique index
+EMAIL_COLLATION = Collation(locale='en', strength=2)
+
+USER_ROLES = ('client', 'admin')
 
 class User:
+    INDEXES = {
+        'users': [
+            IndexModel([('email', ASCENDING)], name='email_unique_ci', unique=True, collation=EMAIL_COLLATION),
+            IndexModel([('role', ASCENDING)], name='role')
+        ]
+    }
+    
     def __init__(self):
-        self.db = Database().db
-        self.collection = self.db.users
+        self.hasher = password_hasher
+        self.principals = principal_cache
+
+    @property
+    def db(self):
+        return Database().db
+
+    @property
+    def collection(self):
+        return self.db.users
         
     def create_user(self, name, email, password, role='client'):
-        """Create a new user"""
-        # Check if user already exists
-        if self.collection.find_one({'email': email}):
-            return {'success': False, 'message': 'Email already exists'}
-        
-        user_data = {
-            'name': name,
-            'email': email.lower(),
-            'password': generate_password_hash(password),
-            'role': role,
-            'created_at': datetime.utcnow()
-        }
-        
+        """Create a new user; the unique email index rejects duplicates"""
         try:
+            user_data = {
+                'name': name,
+                'email': email.lower(),
+                'password': self.hasher.hash(password),
+                'role': role,
+                'created_at': datetime.utcnow()
+            }
             result = self.collection.insert_one(user_data)
             return {'success': True, 'user_id': str(result.inserted_id)}
+        except DuplicateKeyError:
+            return {'success': False, 'message': 'Email already exists'}
+        except HashPoolBusy:
+            return {'success': False, 'message': 'The server is busy. Please try again in a moment.'}
         except Exception as e:
             return {'success': False, 'message': str(e)}
     
-    def authenticate_user(self, email, password):
-        """Authenticate user login"""
-        user = self.collection.find_one({'email': email.lower()})
+    def import_users(self, records, batch_size=1000, workers=None, hash_method=None, on_progress=None,
+                     allow_admin=False):
+        """Bulk-insert users from dicts with name, email, password and optional role.
+        
+        Rows with an invalid email or an unknown role are reported as errors;
+        admin rows are only accepted with allow_admin.
+        
+        Passwords are hashed in parallel and each batch goes in with one
+        unordered insert_many, so duplicates are skipped without stopping
+        the batch. hash_method overrides the configured one (e.g. a cheaper
+        cost for a migration); such hashes are upgraded on first login.
+        on_progress(report) is called after every batch.
+        """
+        # utils.helpers imports this module
+        from utils.helpers import validate_email
+        
+        method = hash_method or self.hasher.method
+        report = {'processed': 0, 'inserted': 0, 'duplicates': 0, 'errors': []}
+        records = iter(records)
+        
+        with ThreadPoolExecutor(max_workers=workers or Config.AUTH_HASH_WORKERS) as pool:
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                
+                valid = []
+                for offset, record in enumerate(batch):
+                    row = report['processed'] + offset + 1
+                    email = str(record.get('email') or '').strip().lower()
+                    role = str(record.get('role') or 'client').strip().lower()
+                    if not email or not record.get('password'):
+                        message = 'Email and password are required'
+                    elif not validate_email(email):
+                        message = 'Invalid email address'
+                    elif role not in USER_ROLES:
+                        message = f"Role must be one of {', '.join(USER_ROLES)}"
+                    elif role == 'admin' and not allow_admin:
+                        message = 'Admin accounts are not allowed in this import'
+                    else:
+                        valid.append((row, dict(record, email=email, role=role)))
+                        continue
+                    report['errors'].append({'row': row, 'email': record.get('email'), 'message': message})
+                
+                hashes = pool.map(lambda item: generate_password_hash(item[1]['password'], method), valid)
+                now = datetime.utcnow()
+                docs = [{
+                    'name': record.get('name') or record['email'].split('@')[0],
+                    'email': record['email'],
+                    'password': pwhash,
+                    'role': record['role'],
+                    'created_at': now
+                } for (_, record), pwhash in zip(valid, hashes)]
+                
+                if docs:
+                    try:
+                        result = self.collection.insert_many(docs, ordered=False)
+                        report['inserted'] += len(result.inserted_ids)
+                    except BulkWriteError as e:
+                        details = e.details
+                        report['inserted'] += details.get('nInserted', 0)
+                        for error in details.get('writeErrors', []):
+                            if error.get('code') == 11000:
+                                report['duplicates'] += 1
+                            else:
+                                row, record = valid[error['index']]
+                                report['errors'].append({'row': row, 'email': record['email'], 'message': error.get('errmsg')})
+                
+                report['processed'] += len(batch)
+                if on_progress:
+                    on_progress(report)
+        
+        return report
+    
+    def authenticate_user(self, email, password, ip=None, throttle=True):
+        """Authenticate user login.
+        
+        Per-IP and per-email throttling runs before any hashing; a hash made
+        with an outdated method or cost is replaced after a successful login.
+        """
+        email = email.lower()
+        if throttle:
+            for limiter, key in ((login_ip_limiter, ip), (login_email_limiter, email)):
+                allowed, retry_after = limiter.allow(key)
+                if not allowed:
+                    return {
+                        'success': False,
+                        'throttled': True,
+                        'retry_after': int(retry_after) + 1,
+                        'message': f'Too many login attempts. Please try again in {int(retry_after) + 1} seconds.'
+                    }
         
-        if user and check_password_hash(user['password'], password):
-            user['_id'] = str(user['_id'])  # Convert ObjectId to string
-            return {'success': True, 'user': user}
+        try:
+            user = self.collection.find_one({'email': email}, collation=EMAIL_COLLATION)
+            if not user:
+                self.hasher.verify_dummy(password)
+            elif self.hasher.verify(user['password'], password):
+                if self.hasher.needs_rehash(user['password']):
+                    self._rehash_password(user, password)
+                login_email_limiter.reset(email)
+                user['_id'] = str(user['_id'])  # Convert ObjectId to string
+                return {'success': True, 'user': user}
+        except HashPoolBusy:
+            return {'success': False, 'throttled': True, 'retry_after': 1,
+                    'message': 'The server is busy. Please try again in a moment.'}
         
         return {'success': False, 'message': 'Invalid email or password'}
     
+    def _rehash_password(self, user, password):
+        """Store the password under the configured hash method; skipped if it changed meanwhile"""
+        try:
+            new_hash = self.hasher.hash(password)
+            self.collection.update_one(
+                {'_id': user['_id'], 'password': user['password']},
+                {'$set': {'password': new_hash}}
+            )
+            user['password'] = new_hash
+        except Exception as e:
+            print(f"Error upgrading password hash: {e}")
+    
     def get_user_by_id(self, user_id):
         """Get user by ID"""
         try:
@@ -61,6 +198,31 @@ class User:
             pass
         return None
     
+    def get_principal(self, user_id):
+        """Get the user without the password hash, cached for PRINCIPAL_CACHE_TTL"""
+        def load():
+            user = self.get_user_by_id(user_id)
+            if user:
+                user.pop('password', None)
+            return user
+        
+        try:
+            return self.principals.get_or_load(user_id, load)
+        except Exception as e:
+            print(f"Error loading user {user_id}: {e}")
+            return None
+    
+    def update_user_role(self, user_id, role):
+        """Change a user's role; takes effect on their next request"""
+        try:
+            result = self.collection.update_one({'_id': ObjectId(user_id)}, {'$set': {'role': role}})
+            self.principals.delete(user_id)
+            if result.matched_count == 0:
+                return {'success': False, 'message': 'User not found'}
+            return {'success': True, 'message': 'Role updated successfully'}
+        except Exception as e:
+            return {'success': False, 'message': str(e)}
+    
     def create_admin_user(self):
         """Create default admin user if none exists"""
         admin = self.collection.find_one({'role': 'admin'})
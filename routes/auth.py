@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, make_response
 from models.user import User
 
 auth_bp = Blueprint('auth', __name__)
@@ -46,7 +46,13 @@ def login():
             flash('Email and password are required', 'error')
             return render_template('auth/login.html')
         
-        result = user_model.authenticate_user(email, password)
+        result = user_model.authenticate_user(email, password, ip=request.remote_addr)
+        
+        if result.get('throttled'):
+            flash(result['message'], 'error')
+            response = make_response(render_template('auth/login.html'), 429)
+            response.headers['Retry-After'] = str(result['retry_after'])
+            return response
         
         if result['success']:
             user = result['user']
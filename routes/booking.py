@@ -1,13 +1,39 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from models.booking import Booking
-from models.room import Room
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
+from models.booking import Booking, decode_cursor, booking_modal_cache
+from models.room import Room, room_cache
+from models.availability import OCCUPANCY_HORIZON_MONTHS, months_ahead
 from routes.main import login_required, admin_required
-from datetime import datetime
+from utils.helpers import is_admin
+from bson.objectid import ObjectId
+from datetime import date, datetime
 
 booking_bp = Blueprint('booking', __name__)
 booking_model = Booking()
 room_model = Room()
 
+ADMIN_BOOKINGS_PAGE_SIZE = 20
+MAX_MODAL_PREFETCH = 100
+MAX_AVAILABILITY_STAYS = 50
+MAX_CALENDAR_MONTHS = 12
+MAX_STAY_NIGHTS = 60
+MY_BOOKINGS_PAGE_SIZE = 10
+
+def _admin_booking_filters(args):
+    """Read the manage-bookings filter form from query args"""
+    filters = {
+        'status': args.get('status') or None,
+        'guest': (args.get('guest_name') or '').strip() or None,
+        'room': (args.get('room_number') or '').strip() or None,
+        'date_from': None,
+        'date_to': None
+    }
+    for key in ('date_from', 'date_to'):
+        try:
+            filters[key] = datetime.strptime(args.get(key, ''), '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    return filters
+
 @booking_bp.route('/book/<room_id>')
 @login_required
 def book_room(room_id):
@@ -47,7 +73,7 @@ def create_booking():
         return redirect(url_for('room.browse'))
     
     room = room_result['room']
-    total_price = booking_model.calculate_booking_price(room['price'], check_in, check_out)
+    total_price = booking_model.calculate_booking_price(room, check_in, check_out)
     
     if total_price <= 0:
         flash('Invalid date range', 'error')
@@ -73,18 +99,45 @@ def create_booking():
 @login_required
 def my_bookings():
     """Show user's bookings"""
-    result = booking_model.get_user_bookings(session['user_id'])
+    page = max(request.args.get('page', 1, type=int), 1)
+    
+    # Fetch one extra row to know whether there is a next page
+    result = booking_model.get_user_bookings(
+        session['user_id'], limit=MY_BOOKINGS_PAGE_SIZE + 1, offset=(page - 1) * MY_BOOKINGS_PAGE_SIZE
+    )
     bookings = result['bookings'] if result['success'] else []
+    has_next = len(bookings) > MY_BOOKINGS_PAGE_SIZE
+    bookings = bookings[:MY_BOOKINGS_PAGE_SIZE]
     
-    # Calculate booking statistics
-    stats = {
-        'total': len(bookings),
-        'confirmed': len([b for b in bookings if b['status'] == 'confirmed']),
-        'pending': len([b for b in bookings if b['status'] == 'pending']),
-        'completed': len([b for b in bookings if b['status'] == 'completed'])
+    stats_result = booking_model.get_user_booking_stats(session['user_id'])
+    stats = stats_result['stats'] if stats_result['success'] else {
+        'total': 0, 'pending': 0, 'confirmed': 0, 'cancelled': 0, 'completed': 0
     }
     
-    return render_template('booking/my_bookings.html', bookings=bookings, stats=stats)
+    return render_template('booking/my_bookings.html', bookings=bookings, stats=stats,
+                         page=page, has_next=has_next)
+
+@booking_bp.route('/my-bookings/export')
+@login_required
+def export_my_bookings():
+    """Stream the user's full booking history as CSV"""
+    result = booking_model.get_user_bookings(
+        session['user_id'], fields=['status', 'total_price', 'created_at'], stream=True
+    )
+    if not result['success']:
+        flash('Unable to export bookings', 'error')
+        return redirect(url_for('booking.my_bookings'))
+    
+    def generate():
+        yield 'booking_id,room,check_in,check_out,nights,total_price,status,booked_on\n'
+        for booking in result['bookings']:
+            room_name = booking['room'].get('name', '').replace('"', '""')
+            yield (f"{booking['_id']},\"{room_name}\",{booking['check_in']:%Y-%m-%d},"
+                   f"{booking['check_out']:%Y-%m-%d},{booking['nights']},{booking['total_price']:.2f},"
+                   f"{booking['status']},{booking['created_at']:%Y-%m-%d}\n")
+    
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': 'attachment; filename=my-bookings.csv'})
 
 @booking_bp.route('/details/<booking_id>')
 @login_required
@@ -99,7 +152,7 @@ def booking_details(booking_id):
     booking = result['booking']
     
     # Check if user owns this booking or is admin
-    if session['user_role'] != 'admin' and str(booking['user_id']) != session['user_id']:
+    if not is_admin() and str(booking['user_id']) != session['user_id']:
         flash('Access denied', 'error')
         return redirect(url_for('booking.my_bookings'))
     
@@ -109,7 +162,7 @@ def booking_details(booking_id):
 @login_required
 def cancel_booking(booking_id):
     """Cancel a booking"""
-    user_id = session['user_id'] if session['user_role'] != 'admin' else None
+    user_id = session['user_id'] if not is_admin() else None
     result = booking_model.cancel_booking(booking_id, user_id)
     
     if result['success']:
@@ -123,19 +176,43 @@ def cancel_booking(booking_id):
 @admin_required
 def admin_bookings():
     """Admin view of all bookings"""
-    result = booking_model.get_all_bookings()
+    result = booking_model.get_bookings_page(
+        limit=ADMIN_BOOKINGS_PAGE_SIZE, **_admin_booking_filters(request.args)
+    )
     bookings = result['bookings'] if result['success'] else []
+    next_cursor = result.get('next_cursor')
     
-    # Calculate booking statistics
-    stats = {
-        'total': len(bookings),
-        'confirmed': len([b for b in bookings if b['status'] == 'confirmed']),
-        'pending': len([b for b in bookings if b['status'] == 'pending']),
-        'completed': len([b for b in bookings if b['status'] == 'completed']),
-        'cancelled': len([b for b in bookings if b['status'] == 'cancelled'])
+    stats_result = booking_model.get_booking_stats()
+    stats = stats_result['stats'] if stats_result['success'] else {
+        'total': 0, 'pending': 0, 'confirmed': 0, 'cancelled': 0, 'completed': 0, 'revenue': 0
     }
     
-    return render_template('admin/manage_bookings.html', bookings=bookings, stats=stats)
+    return render_template('admin/manage_bookings.html', bookings=bookings, stats=stats, next_cursor=next_cursor)
+
+@booking_bp.route('/admin/api/bookings')
+@admin_required
+def admin_bookings_api():
+    """AJAX endpoint returning the next page of bookings as table rows"""
+    limit = max(1, min(request.args.get('limit', ADMIN_BOOKINGS_PAGE_SIZE, type=int), 100))
+    cursor = request.args.get('cursor') or None
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except Exception:
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+    
+    result = booking_model.get_bookings_page(
+        limit=limit, cursor=cursor, **_admin_booking_filters(request.args)
+    )
+    if not result['success']:
+        return jsonify({'success': False, 'message': result['message']}), 500
+    
+    return jsonify({
+        'success': True,
+        'html': render_template('admin/booking_rows.html', bookings=result['bookings']),
+        'count': len(result['bookings']),
+        'next_cursor': result['next_cursor']
+    })
 
 @booking_bp.route('/admin/update-status/<booking_id>', methods=['POST'])
 @admin_required
@@ -153,22 +230,59 @@ def update_booking_status(booking_id):
     
     return redirect(url_for('booking.admin_bookings'))
 
+def _booking_modals(booking_ids):
+    """Rendered detail modals by booking id, re-rendering only those that changed.
+    
+    A cached modal is reused while the booking's updated_at and snapshot_at
+    (rewrites of its embedded room and user) and the room catalog version
+    match what it was rendered from.
+    """
+    result = booking_model.get_booking_versions(booking_ids)
+    if not result['success']:
+        return {}
+    
+    room_version = room_cache.version()
+    stamps = {
+        booking_id: f"{updated_at}|{snapshot_at}|{room_version}"
+        for booking_id, (updated_at, snapshot_at) in result['versions'].items()
+    }
+    modals, stale = {}, []
+    for booking_id, stamp in stamps.items():
+        entry = booking_modal_cache.get(booking_id)
+        if entry and entry['stamp'] == stamp:
+            modals[booking_id] = entry['html']
+        else:
+            stale.append(booking_id)
+    
+    if stale:
+        result = booking_model.get_bookings_by_ids(stale)
+        for booking_id, booking in (result['bookings'] if result['success'] else {}).items():
+            html = render_template('admin/booking_details_modal.html', booking=booking)
+            booking_modal_cache.set(booking_id, {'stamp': stamps[booking_id], 'html': html})
+            modals[booking_id] = html
+    return modals
+
 @booking_bp.route('/admin/booking/details/<booking_id>')
 @admin_required
 def admin_booking_details(booking_id):
     """Get booking details for admin modal (AJAX endpoint)"""
-    result = booking_model.get_booking_by_id(booking_id)
+    html_content = _booking_modals([booking_id]).get(booking_id)
     
-    if not result['success']:
+    if not html_content:
         return jsonify({'success': False, 'message': 'Booking not found'})
     
-    booking = result['booking']
-    
-    # Render the booking details as HTML
-    html_content = render_template('admin/booking_details_modal.html', booking=booking)
-    
     return jsonify({'success': True, 'html': html_content})
 
+@booking_bp.route('/admin/api/booking-details')
+@admin_required
+def admin_booking_details_batch():
+    """Prefetch the detail modals for the bookings on screen (AJAX endpoint)"""
+    booking_ids = [booking_id for booking_id in request.args.get('ids', '').split(',') if booking_id]
+    if len(booking_ids) > MAX_MODAL_PREFETCH:
+        return jsonify({'success': False, 'message': f'At most {MAX_MODAL_PREFETCH} bookings per request'}), 400
+    
+    return jsonify({'success': True, 'modals': _booking_modals(booking_ids)})
+
 @booking_bp.route('/admin/booking/delete/<booking_id>', methods=['POST'])
 @admin_required
 def admin_delete_booking(booking_id):
@@ -180,35 +294,93 @@ def admin_delete_booking(booking_id):
     else:
         return jsonify({'success': False, 'message': result['message']})
 
+def _availability_horizon():
+    """(today, first day past the occupancy horizon) as dates"""
+    today = date.today()
+    return today, date.fromordinal(months_ahead(today.toordinal(), OCCUPANCY_HORIZON_MONTHS))
+
+def _parse_stay(stay):
+    """Validate one {room_id, check_in, check_out} item; returns (room_id, check_in, check_out)"""
+    room_id = stay['room_id']
+    check_in = datetime.strptime(stay['check_in'], '%Y-%m-%d').date()
+    check_out = datetime.strptime(stay['check_out'], '%Y-%m-%d').date()
+    if not ObjectId.is_valid(room_id) or check_in >= check_out:
+        raise ValueError('Invalid room or date range')
+    return room_id, check_in, check_out
+
+def _parse_batch_stay(stay):
+    """Like _parse_stay, for the batch API: stays must also be at most
+    MAX_STAY_NIGHTS long and lie between today and the end of the occupancy
+    horizon, which bounds the work per item of a batch.
+    """
+    room_id, check_in, check_out = _parse_stay(stay)
+    today, horizon_end = _availability_horizon()
+    if check_in < today or check_out > horizon_end or (check_out - check_in).days > MAX_STAY_NIGHTS:
+        raise ValueError('Invalid room or date range')
+    return room_id, check_in, check_out
+
+def _parse_calendar_month(month):
+    """Validate a 'YYYY-MM' month within the occupancy horizon"""
+    first_day = datetime.strptime(month, '%Y-%m').date()
+    today, horizon_end = _availability_horizon()
+    if first_day < today.replace(day=1) or first_day >= horizon_end:
+        raise ValueError('Month outside the availability horizon')
+    return month
+
+@booking_bp.route('/api/availability', methods=['POST'])
+def availability_api():
+    """Batch availability: many stays and per-room month calendars in one request.
+    
+    Body: {"stays": [{"room_id", "check_in", "check_out"}, ...],
+           "months": ["YYYY-MM", ...], "rooms": [room_id, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    stays = data.get('stays') or []
+    months = data.get('months') or []
+    rooms = data.get('rooms') or []
+    if len(stays) > MAX_AVAILABILITY_STAYS or len(rooms) > MAX_AVAILABILITY_STAYS or len(months) > MAX_CALENDAR_MONTHS:
+        return jsonify({'success': False, 'message': 'Too many stays, rooms or months in one request'}), 400
+    
+    try:
+        for month in months:
+            _parse_calendar_month(month)
+        if not all(ObjectId.is_valid(room_id) for room_id in rooms):
+            raise ValueError('Invalid room id')
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid months or rooms'}), 400
+    
+    parsed, errors = [], {}
+    for position, stay in enumerate(stays):
+        try:
+            parsed.append(_parse_batch_stay(stay))
+        except (KeyError, TypeError, ValueError):
+            errors[position] = {'success': False, 'message': 'Invalid room or date range'}
+    
+    result = booking_model.check_availability_batch(parsed, months, rooms)
+    if not result['success']:
+        return jsonify(result), 500
+    
+    answers = iter(result['results'])
+    results = [errors[position] if position in errors else next(answers) for position in range(len(stays))]
+    return jsonify({'success': True, 'results': results, 'calendars': result['calendars']})
+
 @booking_bp.route('/check-availability', methods=['POST'])
 def check_availability():
     """AJAX endpoint to check room availability"""
-    room_id = request.json.get('room_id')
-    check_in_str = request.json.get('check_in')
-    check_out_str = request.json.get('check_out')
-    
     try:
-        check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
-        check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
-        
-        available = booking_model.is_room_available(room_id, check_in, check_out)
-        
-        if available:
-            # Calculate price
-            room_result = room_model.get_room_by_id(room_id)
-            if room_result['success']:
-                total_price = booking_model.calculate_booking_price(
-                    room_result['room']['price'], check_in, check_out
-                )
-                nights = (check_out - check_in).days
-                return jsonify({
-                    'available': True,
-                    'total_price': total_price,
-                    'nights': nights,
-                    'price_per_night': room_result['room']['price']
-                })
-        
-        return jsonify({'available': False, 'message': 'Room not available for selected dates'})
-    
-    except Exception as e:
+        stay = _parse_stay(request.get_json(silent=True) or {})
+    except (KeyError, TypeError, ValueError):
         return jsonify({'available': False, 'message': 'Invalid request'}), 400
+    
+    result = booking_model.check_availability_batch([stay])
+    answer = result['results'][0] if result['success'] else {'success': False}
+    if answer['success'] and answer['available']:
+        return jsonify({
+            'available': True,
+            'total_price': answer['price']['total'],
+            'nights': answer['price']['nights'],
+            'price_per_night': answer['price']['price_per_night'],
+            'price': answer['price']
+        })
+    
+    return jsonify({'available': False, 'message': 'Room not available for selected dates'})
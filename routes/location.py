@@ -1,23 +1,38 @@
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
-from models.location import Location
-from models.user import User
+from flask import Blueprint, render_template, request, jsonify, redirect
+from models.location import Location, GOOGLE_PLACE_TYPES, MIN_NEARBY_RADIUS, MAX_NEARBY_RADIUS
+from utils.helpers import admin_required, admin_api_required
+from utils.page_cache import cached_page
 from config import Config
 import json
 
 location_bp = Blueprint('location', __name__)
+location_model = Location()
+
+def _cacheable(response):
+    """Let browsers reuse a response and revalidate it with If-None-Match"""
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.PLACE_DETAILS_MAX_AGE
+    response.add_etag()
+    return response.make_conditional(request)
+
+def _hotel_info_stamp():
+    """updated_at of the hotel info; the same in every worker, unlike a local counter"""
+    hotel_info = location_model.get_hotel_info()
+    return hotel_info.get('updated_at') if hotel_info else None
 
 @location_bp.route('/hotel-info')
+@cached_page(_hotel_info_stamp)
 def hotel_info():
     """Display hotel information and location"""
-    location_model = Location()
     hotel_info = location_model.get_hotel_info()
     
-    # Get nearby places for different categories
-    attractions = location_model.get_nearby_places('tourist_attraction')
-    restaurants = location_model.get_nearby_places('restaurant')
-    shopping = location_model.get_nearby_places('shopping_mall')
-    
-    location_model.close_connection()
+    # Get nearby places for different categories (fetched concurrently)
+    nearby = location_model.get_nearby_places_bulk(
+        ['tourist_attraction', 'restaurant', 'shopping_mall'], hotel_info=hotel_info
+    )
+    attractions = nearby['tourist_attraction']
+    restaurants = nearby['restaurant']
+    shopping = nearby['shopping_mall']
     
     return render_template('location/hotel_info.html',
                          hotel_info=hotel_info,
@@ -28,18 +43,23 @@ def hotel_info():
 
 @location_bp.route('/api/nearby-places')
 def api_nearby_places():
-    """API endpoint to get nearby places"""
+    """API endpoint to get nearby places, nearest first, one page at a time"""
     place_type = request.args.get('type', 'tourist_attraction')
-    radius = request.args.get('radius', 5000, type=int)
+    if place_type not in GOOGLE_PLACE_TYPES:
+        return jsonify({'success': False, 'message': 'Unsupported place type'}), 400
+    radius = request.args.get('radius', MAX_NEARBY_RADIUS, type=int)
+    radius = min(max(radius, MIN_NEARBY_RADIUS), MAX_NEARBY_RADIUS)
+    page = max(request.args.get('page', 1, type=int), 1)
     
-    location_model = Location()
-    places = location_model.get_nearby_places(place_type, radius)
-    location_model.close_connection()
+    result = location_model.find_nearby_places(place_type, radius, page)
     
     return jsonify({
         'success': True,
-        'places': places,
-        'type': place_type
+        'places': result['places'],
+        'type': place_type,
+        'page': result['page'],
+        'has_next': result['has_next'],
+        'source': result['source']
     })
 
 @location_bp.route('/directions')
@@ -47,9 +67,7 @@ def directions():
     """Get directions to hotel or from hotel to destination"""
     destination = request.args.get('to', '')
     
-    location_model = Location()
     directions_url = location_model.get_directions_url(destination if destination else None)
-    location_model.close_connection()
     
     if directions_url:
         return redirect(directions_url)
@@ -57,35 +75,17 @@ def directions():
         return jsonify({'success': False, 'message': 'Unable to generate directions'})
 
 @location_bp.route('/admin/hotel-info')
+@admin_required
 def admin_hotel_info():
     """Admin page to manage hotel information"""
-    # Check if user is admin
-    if 'user_id' not in session:
-        return redirect(url_for('auth.login'))
-    
-    user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
-    if not user or user.get('role') != 'admin':
-        return redirect(url_for('main.dashboard'))
-    
-    location_model = Location()
     hotel_info = location_model.get_hotel_info()
-    location_model.close_connection()
     
     return render_template('admin/hotel_info.html', hotel_info=hotel_info)
 
 @location_bp.route('/admin/hotel-info/update', methods=['POST'])
+@admin_api_required
 def admin_update_hotel_info():
     """Update hotel information (admin only)"""
-    # Check if user is admin
-    if 'user_id' not in session:
-        return jsonify({'success': False, 'message': 'Authentication required'})
-    
-    user_model = User()
-    user = user_model.get_user_by_id(session['user_id'])
-    if not user or user.get('role') != 'admin':
-        return jsonify({'success': False, 'message': 'Admin access required'})
-    
     try:
         data = request.get_json()
         
@@ -106,23 +106,18 @@ def admin_update_hotel_info():
         if 'policies' in data:
             updates['policies'] = data['policies']
         
-        location_model = Location()
         result = location_model.update_hotel_info(updates)
-        location_model.close_connection()
-        user_model.close_connection()
         
         return jsonify(result)
         
     except Exception as e:
-        user_model.close_connection()
         return jsonify({'success': False, 'message': str(e)})
 
 @location_bp.route('/contact')
+@cached_page(_hotel_info_stamp)
 def contact():
     """Contact page with hotel information"""
-    location_model = Location()
     hotel_info = location_model.get_hotel_info()
-    location_model.close_connection()
     
     return render_template('location/contact.html', 
                          hotel_info=hotel_info,
@@ -131,12 +126,10 @@ def contact():
 @location_bp.route('/api/place-details/<place_id>')
 def api_place_details(place_id):
     """API endpoint to get detailed place information"""
-    location_model = Location()
     place_details = location_model.get_place_details(place_id)
-    location_model.close_connection()
     
     if place_details:
-        return jsonify({'success': True, 'place': place_details})
+        return _cacheable(jsonify({'success': True, 'place': place_details}))
     else:
         return jsonify({'success': False, 'message': 'Place details not found'})
 
@@ -145,11 +138,9 @@ def api_place_photo(photo_reference):
     """API endpoint to get place photo URL"""
     max_width = request.args.get('width', 400, type=int)
     
-    location_model = Location()
     photo_url = location_model.get_place_photo_url(photo_reference, max_width)
-    location_model.close_connection()
     
     if photo_url:
-        return jsonify({'success': True, 'photo_url': photo_url})
+        return _cacheable(jsonify({'success': True, 'photo_url': photo_url}))
     else:
         return jsonify({'success': False, 'message': 'Photo not available'})
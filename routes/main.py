@@ -1,54 +1,39 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash
-from functools import wraps
-from models.user import User
+from flask import Blueprint, render_template, session, jsonify
 from models.room import Room
 from models.booking import Booking
+from models.database import Database
+from models.location import maps_client
+from utils.page_cache import cached_page
+# Re-exported for the other blueprints
+from utils.helpers import login_required, admin_required, current_user
 
 main_bp = Blueprint('main', __name__)
-user_model = User()
 room_model = Room()
 booking_model = Booking()
 
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please login to access this page', 'error')
-            return redirect(url_for('auth.login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please login to access this page', 'error')
-            return redirect(url_for('auth.login'))
-        if session.get('user_role') != 'admin':
-            flash('Admin access required', 'error')
-            return redirect(url_for('main.dashboard'))
-        return f(*args, **kwargs)
-    return decorated_function
-
 @main_bp.route('/')
+@cached_page()
 def index():
     return render_template('index.html')
 
 @main_bp.route('/dashboard')
 @login_required
 def dashboard():
-    user = user_model.get_user_by_id(session['user_id'])
+    user = current_user()
     
     # Get user's recent bookings
-    bookings_result = booking_model.get_user_bookings(session['user_id'])
-    recent_bookings = bookings_result['bookings'][:3] if bookings_result['success'] else []
+    bookings_result = booking_model.get_user_bookings(
+        session['user_id'], limit=3,
+        fields=['status', 'total_price', 'created_at']
+    )
+    recent_bookings = bookings_result['bookings'] if bookings_result['success'] else []
     
     return render_template('dashboard.html', user=user, recent_bookings=recent_bookings)
 
 @main_bp.route('/admin')
 @admin_required
 def admin_dashboard():
-    user = user_model.get_user_by_id(session['user_id'])
+    user = current_user()
     
     # Get statistics
     room_stats = room_model.get_room_count()
@@ -62,3 +47,15 @@ def admin_dashboard():
     }
     
     return render_template('admin/dashboard.html', user=user, stats=stats)
+
+@main_bp.route('/admin/api/db-pool')
+@admin_required
+def db_pool_stats():
+    """API endpoint for shared MongoDB connection pool statistics"""
+    return jsonify({'success': True, 'pool': Database().pool_stats()})
+
+@main_bp.route('/admin/api/upstream-stats')
+@admin_required
+def upstream_stats():
+    """API endpoint for Google Maps latency metrics and circuit breaker state"""
+    return jsonify({'success': True, 'endpoints': maps_client.stats()})
@@ -1,9 +1,68 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from models.room import Room
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context
+from models.room import Room, room_cache
+from models.booking import Booking, availability_versions
+from models.availability import OCCUPANCY_HORIZON_MONTHS, pack_nights, run_lengths
+from models.pricing import PricingRule, pricing_rules_cache
 from routes.main import admin_required
+from utils.helpers import admin_api_required
+from utils.page_cache import cached_page
+from datetime import datetime, timedelta
+import csv
+import hashlib
+import io
+import json
 
 room_bp = Blueprint('room', __name__)
 room_model = Room()
+booking_model = Booking()
+pricing_rule_model = PricingRule()
+
+# Imported rooms written per bulk_write
+ROOM_IMPORT_BATCH_SIZE = 500
+
+def _parse_stay_dates(args):
+    """Parse optional check_in/check_out query args; returns (check_in, check_out, error)"""
+    check_in_str = args.get('check_in')
+    check_out_str = args.get('check_out')
+    if not check_in_str and not check_out_str:
+        return None, None, None
+    
+    try:
+        check_in = datetime.strptime(check_in_str or '', '%Y-%m-%d').date()
+        check_out = datetime.strptime(check_out_str or '', '%Y-%m-%d').date()
+    except ValueError:
+        return None, None, 'Invalid date format'
+    
+    if check_in >= check_out:
+        return None, None, 'Check-out date must be after check-in date'
+    return check_in, check_out, None
+
+def _import_rows(stream, is_csv, summary):
+    """Read rooms from an upload one row at a time: CSV with a header, or JSON lines.
+    
+    An unreadable upload (bad encoding or CSV) ends the rows and is noted in
+    ``summary``; the rows read before it are still imported.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if is_csv:
+            yield from csv.DictReader(text)
+            return
+        for line in text:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Reported as an invalid row by the importer
+                    yield None
+    except (UnicodeDecodeError, csv.Error) as e:
+        summary['error'] = f'Could not read the upload: {e}'
+
+def _stay_availability_stamp():
+    """Booking and pricing versions for searches with stay dates; other pages ignore both"""
+    if request.args.get('check_in') or request.args.get('check_out'):
+        return availability_versions.version(), pricing_rules_cache.version()
+    return None
 
 @room_bp.route('/admin/rooms')
 @admin_required
@@ -130,7 +189,35 @@ def create_sample_rooms():
     
     return redirect(url_for('room.manage_rooms'))
 
+@room_bp.route('/admin/rooms/import', methods=['POST'])
+@admin_api_required
+def import_rooms():
+    """Create and update rooms in bulk from a CSV or JSON-lines upload.
+    
+    Accepts a multipart ``file`` or the raw body (text/csv or JSON lines).
+    Rows with a room_id update that room, others create one. The response
+    streams one JSON line per row as each batch is written, then a summary.
+    Only a raw body is read as it arrives; a multipart upload is spooled to a
+    temporary file by the form parser before the first row is imported.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream, is_csv = upload.stream, upload.filename.lower().endswith('.csv')
+    else:
+        stream, is_csv = request.stream, request.mimetype == 'text/csv'
+    
+    def generate():
+        summary = {'rows': 0, 'created': 0, 'updated': 0, 'failed': 0}
+        for result in room_model.import_rooms(_import_rows(stream, is_csv, summary), ROOM_IMPORT_BATCH_SIZE):
+            summary['rows'] += 1
+            summary[result['action'] if result['success'] else 'failed'] += 1
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': summary}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @room_bp.route('/rooms')
+@cached_page(room_cache.version, _stay_availability_stamp)
 def browse_rooms():
     """Public room browsing page"""
     # Get filter parameters
@@ -138,33 +225,44 @@ def browse_rooms():
     max_price = request.args.get('max_price', type=float)
     min_capacity = request.args.get('min_capacity', type=int)
     amenities = request.args.getlist('amenities')
+    amenity_match = 'all' if request.args.get('amenity_match') == 'all' else 'any'
+    check_in, check_out, date_error = _parse_stay_dates(request.args)
+    if date_error:
+        flash(date_error, 'error')
     
     # Search rooms
-    if any([min_price, max_price, min_capacity, amenities]):
-        result = room_model.search_rooms(min_price, max_price, min_capacity, amenities)
+    if check_in and check_out:
+        result = booking_model.search_available_rooms(
+            check_in, check_out, min_price, max_price, min_capacity, amenities, amenity_match
+        )
+    elif any([min_price, max_price, min_capacity, amenities]):
+        result = room_model.search_rooms(min_price, max_price, min_capacity, amenities, amenity_match)
     else:
         result = room_model.get_all_rooms(available_only=True)
     
     rooms = result.get('rooms', []) if result['success'] else []
+    if check_in and check_out:
+        for room in rooms:
+            room['stay_price'] = booking_model.price_breakdown(room, check_in, check_out)
     
-    # Get all amenities for filter dropdown
-    all_amenities = set()
-    all_rooms_result = room_model.get_all_rooms(available_only=True)
-    if all_rooms_result['success']:
-        for room in all_rooms_result['rooms']:
-            all_amenities.update(room.get('amenities', []))
+    # Amenity filter options with counts for the current results
+    amenity_facets = room_model.get_amenity_facets([room['_id'] for room in rooms])
     
     return render_template('rooms/browse.html', 
                          rooms=rooms, 
-                         all_amenities=sorted(all_amenities),
+                         amenity_facets=amenity_facets,
                          filters={
                              'min_price': min_price,
                              'max_price': max_price,
                              'min_capacity': min_capacity,
-                             'amenities': amenities
+                             'amenities': amenities,
+                             'amenity_match': amenity_match,
+                             'check_in': check_in.isoformat() if check_in else '',
+                             'check_out': check_out.isoformat() if check_out else ''
                          })
 
 @room_bp.route('/rooms/<room_id>')
+@cached_page(room_cache.version)
 def room_details(room_id):
     """Room details page"""
     result = room_model.get_room_by_id(room_id)
@@ -180,6 +278,105 @@ def room_details(room_id):
     
     return render_template('rooms/details.html', room=room)
 
+@room_bp.route('/rooms/<room_id>/calendar')
+def room_calendar(room_id):
+    """Occupancy of a room's coming nights in one compact payload.
+    
+    ``months`` (1-18, default 12) sets the span. ``format=rle`` returns
+    ``runs``: alternating free/booked night counts starting with a free run;
+    otherwise ``bitmap`` is base64 with one bit per night from ``start``,
+    least significant bit first, set when the night is booked.
+    """
+    months = min(max(request.args.get('months', 12, type=int), 1), OCCUPANCY_HORIZON_MONTHS)
+    encoding = 'rle' if request.args.get('format') == 'rle' else 'bitmap'
+    
+    if not room_model.get_room_by_id(room_id)['success']:
+        return jsonify({'success': False, 'message': 'Room not found'}), 404
+    
+    result = booking_model.get_room_occupancy(room_id, months)
+    if not result['success']:
+        return jsonify(result), 500
+    
+    nights = result['nights']
+    payload = {
+        'success': True,
+        'room_id': room_id,
+        'start': result['start'].isoformat(),
+        'end': (result['start'] + timedelta(days=len(nights))).isoformat(),
+        'days': len(nights),
+        'format': encoding
+    }
+    if encoding == 'rle':
+        payload['runs'] = run_lengths(nights)
+    else:
+        payload['bitmap'] = pack_nights(nights)
+    
+    response = jsonify(payload)
+    # Bookings change at any time, so clients revalidate; unchanged calendars get a 304
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@room_bp.route('/api/rooms/available')
+def available_rooms_api():
+    """API endpoint listing rooms free for a date range"""
+    check_in, check_out, date_error = _parse_stay_dates(request.args)
+    if date_error or not check_in:
+        return jsonify({'success': False, 'message': date_error or 'check_in and check_out are required'}), 400
+    
+    result = booking_model.search_available_rooms(
+        check_in, check_out,
+        request.args.get('min_price', type=float),
+        request.args.get('max_price', type=float),
+        request.args.get('min_capacity', type=int),
+        request.args.getlist('amenities'),
+        'all' if request.args.get('amenity_match') == 'all' else 'any'
+    )
+    if not result['success']:
+        return jsonify(result), 500
+    
+    return jsonify({
+        'success': True,
+        'check_in': check_in.isoformat(),
+        'check_out': check_out.isoformat(),
+        'count': len(result['rooms']),
+        'rooms': result['rooms']
+    })
+
+@room_bp.route('/admin/api/pricing-rules')
+@admin_api_required
+def pricing_rules_api():
+    """List every pricing rule"""
+    result = pricing_rule_model.get_rules()
+    if result['success']:
+        return jsonify(result)
+    return jsonify(result), 500
+
+@room_bp.route('/admin/api/pricing-rules', methods=['POST'])
+@admin_api_required
+def create_pricing_rule():
+    """Add a weekend, season or length-of-stay rule from a JSON body"""
+    data = dict(request.get_json(silent=True) or {})
+    result = pricing_rule_model.create_rule(data.pop('kind', None), data.pop('name', None), data.pop('room_ids', None), **data)
+    if result['success']:
+        return jsonify(result), 201
+    return jsonify(result), 400
+
+@room_bp.route('/admin/api/pricing-rules/<rule_id>', methods=['PATCH'])
+@admin_api_required
+def update_pricing_rule(rule_id):
+    """Enable or disable a pricing rule"""
+    data = request.get_json(silent=True) or {}
+    result = pricing_rule_model.set_rule_active(rule_id, data.get('active', True))
+    return jsonify(result), 200 if result['success'] else 404
+
+@room_bp.route('/admin/api/pricing-rules/<rule_id>', methods=['DELETE'])
+@admin_api_required
+def delete_pricing_rule(rule_id):
+    """Delete a pricing rule"""
+    result = pricing_rule_model.delete_rule(rule_id)
+    return jsonify(result), 200 if result['success'] else 404
+
 @room_bp.route('/api/rooms/stats')
 @admin_required
 def room_stats_api():
@@ -0,0 +1,174 @@
+// Availability lookups for the booking forms.
+// Date changes are debounced and sent to /booking/api/availability as one
+// batch; the booked dates it returns are kept per room and month, so stays
+// that hit a known booked night are rejected without asking the server.
+
+const Availability = (function() {
+    const ENDPOINT = '/booking/api/availability';
+    const DEBOUNCE_MS = 300;
+    const CALENDAR_TTL_MS = 30000;
+    const MAX_MONTHS = 12;
+
+    const calendars = {};  // room_id -> {'YYYY-MM': {booked: Set, fetchedAt}}
+    let pendingStays = {}; // room_id -> {stay, resolve, reject}
+    let pendingMonths = {}; // room_id -> Set of months to fetch
+    let timer = null;
+
+    function parseDate(iso) {
+        const parts = iso.split('-').map(Number);
+        return new Date(Date.UTC(parts[0], parts[1] - 1, parts[2]));
+    }
+
+    function nights(checkIn, checkOut) {
+        const result = [];
+        const day = parseDate(checkIn);
+        const end = parseDate(checkOut);
+        while (day < end) {
+            result.push(day.toISOString().split('T')[0]);
+            day.setUTCDate(day.getUTCDate() + 1);
+        }
+        return result;
+    }
+
+    function monthsOf(dates) {
+        return [...new Set(dates.map(d => d.slice(0, 7)))];
+    }
+
+    function cachedMonth(roomId, month) {
+        const entry = (calendars[roomId] || {})[month];
+        return entry && Date.now() - entry.fetchedAt < CALENDAR_TTL_MS ? entry : null;
+    }
+
+    // Booked nights of the stay if every month is cached, otherwise null
+    function knownConflicts(roomId, checkIn, checkOut) {
+        const stayNights = nights(checkIn, checkOut);
+        const months = monthsOf(stayNights);
+        if (!months.every(month => cachedMonth(roomId, month))) {
+            return null;
+        }
+        return stayNights.filter(night => cachedMonth(roomId, night.slice(0, 7)).booked.has(night));
+    }
+
+    function storeCalendars(received) {
+        const now = Date.now();
+        Object.entries(received || {}).forEach(([roomId, months]) => {
+            calendars[roomId] = calendars[roomId] || {};
+            Object.entries(months).forEach(([month, booked]) => {
+                calendars[roomId][month] = {booked: new Set(booked), fetchedAt: now};
+            });
+        });
+    }
+
+    function schedule() {
+        clearTimeout(timer);
+        timer = setTimeout(flush, DEBOUNCE_MS);
+    }
+
+    function flush() {
+        const batch = Object.values(pendingStays);
+        const monthsByRoom = pendingMonths;
+        pendingStays = {};
+        pendingMonths = {};
+        timer = null;
+
+        // One request carries every queued stay and calendar month
+        const rooms = Object.keys(monthsByRoom);
+        const months = new Set();
+        rooms.forEach(roomId => monthsByRoom[roomId].forEach(month => months.add(month)));
+        batch.forEach(item => rooms.includes(item.stay.room_id) || rooms.push(item.stay.room_id));
+        if (!batch.length && !rooms.length) {
+            return;
+        }
+
+        fetch(ENDPOINT, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                stays: batch.map(item => item.stay),
+                months: [...months].sort().slice(0, MAX_MONTHS),
+                rooms: rooms
+            })
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message || 'Availability check failed');
+            }
+            storeCalendars(data.calendars);
+            batch.forEach((item, i) => item.resolve(data.results[i]));
+        })
+        .catch(error => batch.forEach(item => item.reject(error)));
+    }
+
+    // Load the booked dates of the given months ('YYYY-MM') for a room
+    function prefetch(roomId, months) {
+        const missing = months.filter(month => !cachedMonth(roomId, month));
+        if (missing.length) {
+            pendingMonths[roomId] = new Set([...(pendingMonths[roomId] || []), ...missing]);
+            schedule();
+        }
+    }
+
+    // Resolve with the server result for a stay (availability plus price
+    // breakdown), or null when a newer check for the same room replaced it
+    function check(roomId, checkIn, checkOut) {
+        const conflicts = knownConflicts(roomId, checkIn, checkOut);
+        if (conflicts && conflicts.length) {
+            return Promise.resolve({
+                room_id: roomId, success: true, check_in: checkIn, check_out: checkOut,
+                available: false, conflicts: conflicts, price: null
+            });
+        }
+
+        return new Promise((resolve, reject) => {
+            const previous = pendingStays[roomId];
+            if (previous) {
+                previous.resolve(null);
+            }
+            pendingStays[roomId] = {
+                stay: {room_id: roomId, check_in: checkIn, check_out: checkOut},
+                resolve: resolve,
+                reject: reject
+            };
+            prefetch(roomId, monthsOf(nights(checkIn, checkOut)));
+            schedule();
+        });
+    }
+
+    // Whether a single date is known to be booked for a room
+    function isBooked(roomId, iso) {
+        const entry = cachedMonth(roomId, iso.slice(0, 7));
+        return Boolean(entry && entry.booked.has(iso));
+    }
+
+    // Load a room's occupancy bitmap from /rooms/<id>/calendar; resolves with
+    // {start, end, booked: Set of ISO dates} and fills the month cache
+    function occupancy(roomId, months) {
+        return fetch('/rooms/' + roomId + '/calendar?months=' + (months || 12))
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.message || 'Calendar unavailable');
+                }
+                const bits = atob(data.bitmap);
+                const dates = nights(data.start, data.end);
+                const booked = new Set(dates.filter((d, i) => bits.charCodeAt(i >> 3) & (1 << (i & 7))));
+
+                const received = {};
+                received[roomId] = {};
+                dates.forEach(d => {
+                    const month = d.slice(0, 7);
+                    received[roomId][month] = received[roomId][month] || [];
+                    if (booked.has(d)) {
+                        received[roomId][month].push(d);
+                    }
+                });
+                // The current month is only covered from today, so it stays out of the cache
+                delete received[roomId][data.start.slice(0, 7)];
+                storeCalendars(received);
+                return {start: data.start, end: data.end, booked: booked};
+            });
+    }
+
+    return {check: check, prefetch: prefetch, isBooked: isBooked, nights: nights, occupancy: occupancy};
+})();
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.http_client import CircuitBreaker, CircuitOpenError, HttpClient, UpstreamError
+
+
+class FakeUpstream(BaseHTTPRequestHandler):
+    """Answers with the statuses queued in ``statuses`` (200 once empty)"""
+    statuses = []
+    hits = []
+
+    def do_GET(self):
+        FakeUpstream.hits.append(self.path)
+        if self.path.startswith('/loop'):
+            # Redirects to itself until requests gives up
+            self.send_response(302)
+            self.send_header('Location', self.path)
+            self.end_headers()
+            return
+        status = FakeUpstream.statuses.pop(0) if FakeUpstream.statuses else 200
+        body = json.dumps({'status': status}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_after_threshold_and_allows_one_trial(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+
+
+class HttpClientTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeUpstream)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeUpstream.statuses = []
+        FakeUpstream.hits = []
+        self.client = HttpClient(max_retries=2, backoff=0.001, failure_threshold=1, reset_timeout=0.05)
+
+    def test_retries_server_errors(self):
+        FakeUpstream.statuses = [503, 500]
+        self.assertEqual(self.client.get_json('fake', self.base_url + '/ok'), {'status': 200})
+        self.assertEqual(len(FakeUpstream.hits), 3)
+        self.assertEqual(self.client.stats()['fake']['circuit'], 'closed')
+
+    def test_client_errors_are_not_retried_and_keep_circuit_closed(self):
+        FakeUpstream.statuses = [404]
+        with self.assertRaises(UpstreamError):
+            self.client.get_json('fake', self.base_url + '/missing')
+        self.assertEqual(len(FakeUpstream.hits), 1)
+        self.assertEqual(self.client.stats()['fake']['circuit'], 'closed')
+
+    def test_open_circuit_short_circuits(self):
+        FakeUpstream.statuses = [503, 503, 503]
+        with self.assertRaises(UpstreamError):
+            self.client.get_json('fake', self.base_url + '/down')
+        with self.assertRaises(CircuitOpenError):
+            self.client.get_json('fake', self.base_url + '/down')
+        self.assertEqual(len(FakeUpstream.hits), 3)
+        self.assertEqual(self.client.stats()['fake']['short_circuited'], 1)
+
+        time.sleep(0.06)
+        self.assertEqual(self.client.get_json('fake', self.base_url + '/up'), {'status': 200})
+        self.assertEqual(self.client.stats()['fake']['circuit'], 'closed')
+
+    def test_unexpected_error_ends_half_open_trial(self):
+        FakeUpstream.statuses = [503, 503, 503]
+        with self.assertRaises(UpstreamError):
+            self.client.get_json('fake', self.base_url + '/down')
+
+        time.sleep(0.06)
+        with self.assertRaises(requests.TooManyRedirects):
+            self.client.get_json('fake', self.base_url + '/loop')
+
+        # The failed trial reopened the circuit instead of leaving it stuck half-open
+        time.sleep(0.06)
+        self.assertEqual(self.client.get_json('fake', self.base_url + '/up'), {'status': 200})
+
+
+if __name__ == '__main__':
+    unittest.main()
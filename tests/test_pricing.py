@@ -0,0 +1,117 @@
+import unittest
+from datetime import date, timedelta
+
+from models.availability import OCCUPANCY_HORIZON_MONTHS, months_ahead
+from models.pricing import PricingEngine, RateTable, compile_rates, pricing_rules_cache
+
+MONDAY = date(2026, 10, 12)
+
+
+def weekend_rule(multiplier=1.5, nights=(4, 5), room_ids=()):
+    return {'kind': 'weekend', 'name': 'Weekend', 'nights': list(nights), 'multiplier': multiplier,
+            'room_ids': list(room_ids)}
+
+
+def season_rule(start, end, multiplier=2.0):
+    return {'kind': 'season', 'name': 'Season', 'start': start.toordinal(), 'end': end.toordinal(),
+            'multiplier': multiplier, 'room_ids': []}
+
+
+def stay_rule(min_nights, discount, name=None):
+    return {'kind': 'length_of_stay', 'name': name or f'{min_nights}+ nights', 'min_nights': min_nights,
+            'discount': discount, 'room_ids': []}
+
+
+class CompileRatesTests(unittest.TestCase):
+    def test_weekend_rule_prices_friday_and_saturday(self):
+        rates = compile_rates(100, [weekend_rule()], MONDAY.toordinal(), 7)
+        self.assertEqual(list(rates), [100, 100, 100, 100, 150, 150, 100])
+
+    def test_season_end_is_exclusive(self):
+        start, end = MONDAY + timedelta(days=2), MONDAY + timedelta(days=4)
+        rates = compile_rates(100, [season_rule(start, end)], MONDAY.toordinal(), 6)
+        self.assertEqual(list(rates), [100, 100, 200, 200, 100, 100])
+
+    def test_weekend_and_season_stack(self):
+        rule = season_rule(MONDAY, MONDAY + timedelta(days=7), multiplier=1.1)
+        rates = compile_rates(100, [weekend_rule(), rule], MONDAY.toordinal(), 7)
+        self.assertEqual(rates[0], 110)
+        self.assertEqual(rates[4], 165)
+
+
+class RateTableTests(unittest.TestCase):
+    def setUp(self):
+        self.rules = [weekend_rule()]
+        self.origin = MONDAY.toordinal()
+        self.table = RateTable(100, self.rules, self.origin, 14)
+
+    def test_subtotal_inside_the_table(self):
+        rates, subtotal = self.table.nightly(self.origin + 3, self.origin + 6)
+        self.assertEqual(list(rates), [100, 150, 150])
+        self.assertEqual(subtotal, 400)
+
+    def test_stay_crossing_the_horizon_is_compiled_on_the_fly(self):
+        start, end = self.origin + 10, self.origin + 20
+        rates, subtotal = self.table.nightly(start, end)
+        expected = compile_rates(100, self.rules, start, end - start)
+        self.assertEqual(list(rates), list(expected))
+        self.assertAlmostEqual(subtotal, float(expected.sum()))
+
+    def test_stay_before_the_table_is_compiled_on_the_fly(self):
+        rates, subtotal = self.table.nightly(self.origin - 3, self.origin + 1)
+        self.assertEqual(list(rates), [150, 150, 100, 100])
+        self.assertEqual(subtotal, 500)
+
+    def test_best_applicable_stay_discount_wins(self):
+        table = RateTable(100, [stay_rule(3, 0.05), stay_rule(7, 0.15), stay_rule(14, 0.10)], self.origin, 14)
+        self.assertIsNone(table.stay_discount(2))
+        self.assertEqual(table.stay_discount(5)['discount'], 0.05)
+        self.assertEqual(table.stay_discount(7)['discount'], 0.15)
+        # A longer minimum with a smaller discount doesn't displace the better rule
+        self.assertEqual(table.stay_discount(20)['discount'], 0.15)
+
+
+class PricingEngineTests(unittest.TestCase):
+    def setUp(self):
+        pricing_rules_cache.invalidate()
+        self.rules = []
+        self.engine = PricingEngine(lambda: list(self.rules))
+        self.room = {'_id': 'room-1', 'price': 100}
+
+    def test_quote_applies_weekend_rates_and_discount(self):
+        self.rules = [weekend_rule(), stay_rule(3, 0.1, 'Three nights')]
+        # Friday to Monday: Friday and Saturday at 150, Sunday at 100
+        check_in = date.today() + timedelta(days=(4 - date.today().weekday()) % 7 + 7)
+        quote = self.engine.quote(self.room, check_in, check_in + timedelta(days=3))
+        self.assertEqual([night['rate'] for night in quote['nightly']], [150, 150, 100])
+        self.assertEqual(quote['subtotal'], 400)
+        self.assertEqual(quote['discount'], 40)
+        self.assertEqual(quote['discount_rule'], 'Three nights')
+        self.assertEqual(quote['total'], 360)
+
+    def test_quote_for_a_stay_crossing_the_horizon(self):
+        self.rules = [weekend_rule()]
+        horizon_end = date.fromordinal(months_ahead(date.today().toordinal(), OCCUPANCY_HORIZON_MONTHS))
+        check_in, check_out = horizon_end - timedelta(days=5), horizon_end + timedelta(days=5)
+        quote = self.engine.quote(self.room, check_in, check_out)
+        expected = compile_rates(100, self.rules, check_in.toordinal(), 10)
+        self.assertEqual(quote['nights'], 10)
+        self.assertEqual([night['rate'] for night in quote['nightly']], list(expected))
+        self.assertAlmostEqual(quote['total'], float(expected.sum()))
+
+    def test_rules_for_other_rooms_are_ignored(self):
+        self.rules = [weekend_rule(room_ids=['room-2'])]
+        check_in = date.today() + timedelta(days=(4 - date.today().weekday()) % 7 + 7)
+        quote = self.engine.quote(self.room, check_in, check_in + timedelta(days=2))
+        self.assertEqual(quote['total'], 200)
+
+    def test_table_follows_the_rules_version(self):
+        check_in = date.today() + timedelta(days=(4 - date.today().weekday()) % 7 + 7)
+        self.assertEqual(self.engine.quote(self.room, check_in, check_in + timedelta(days=1))['total'], 100)
+        self.rules = [weekend_rule()]
+        pricing_rules_cache.invalidate()
+        self.assertEqual(self.engine.quote(self.room, check_in, check_in + timedelta(days=1))['total'], 150)
+
+
+if __name__ == '__main__':
+    unittest.main()
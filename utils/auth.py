@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+import time
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hashing pool already has its maximum of queued work"""
+
+
+class PasswordHasher:
+    """Password hashing on a bounded thread pool.
+
+    Werkzeug's pbkdf2/scrypt run in hashlib, which releases the GIL, so
+    ``workers`` threads use up to that many cores. At most ``workers +
+    max_queue`` hashes are pending at once; beyond that calls fail fast with
+    HashPoolBusy instead of piling up behind a login flood. A caller that
+    waits longer than ``timeout`` also gets HashPoolBusy, while its hash
+    keeps its slot until it finishes.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', workers=4, max_queue=32, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        # Verified when the email is unknown, so response time doesn't reveal which emails exist
+        self._dummy_hash = None
+        # The method as Werkzeug records it in hashes (e.g. 'scrypt' -> 'scrypt:32768:8:1')
+        self._stored_method = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashPoolBusy('Password hashing is saturated')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HashPoolBusy('Password hashing timed out')
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def verify_dummy(self, password):
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash('dummy-password')
+        self.verify(self._dummy_hash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether pwhash was made with a different method or cost than configured"""
+        if self._stored_method is None:
+            self._stored_method = self._run(generate_password_hash, '', self.method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._stored_method
+
+
+class RateLimiter:
+    """Token buckets per key: ``burst`` attempts, refilled at ``rate`` per second.
+
+    Idle buckets are full again after burst / rate seconds, so they are
+    dropped once more than ``max_keys`` are held.
+    """
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Take one token for key; returns (allowed, seconds until a token is available)"""
+        if key is None:
+            return True, 0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        retry_after = 0 if allowed else (1 - tokens) / self.rate
+        return allowed, retry_after
+
+    def _prune(self, now):
+        full_after = self.burst / self.rate
+        for key in [k for k, (_, updated) in self._buckets.items() if now - updated >= full_after]:
+            del self._buckets[key]
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
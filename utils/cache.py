@@ -0,0 +1,194 @@
+from collections import OrderedDict
+from config import Config
+import copy
+import pickle
+import threading
+import time
+
+
+class MemoryCacheBackend:
+    """In-process TTL cache with LRU eviction"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        # Callers get their own copy so they can't mutate the cached value
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (copy.deepcopy(value), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        # Counters live outside the LRU so they are never evicted
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by all workers, for multi-process deployments.
+
+    Needs the optional ``redis`` package; LRU eviction is left to the Redis
+    server's maxmemory policy.
+    """
+
+    def __init__(self, url, prefix='hotel:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND='redis' requires the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + 'counter:' + key)
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + 'counter:' + key) or 0)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend():
+    """Get the process-wide cache backend selected by Config.CACHE_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if Config.CACHE_BACKEND == 'redis':
+                    _backend = RedisCacheBackend(Config.CACHE_REDIS_URL)
+                else:
+                    _backend = MemoryCacheBackend(Config.CACHE_MAX_ENTRIES)
+    return _backend
+
+
+class CacheNamespace:
+    """A group of cache keys that can be invalidated together.
+
+    Keys embed the namespace version, so ``invalidate()`` is a single counter
+    increment and stale entries simply age out of the backend.
+    """
+
+    def __init__(self, name, ttl=300, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend or get_cache_backend()
+
+    def version(self):
+        return self.backend.counter(f"{self.name}:version")
+
+    def _key(self, key, version=None):
+        if version is None:
+            version = self.version()
+        return f"{self.name}:v{version}:{key}"
+
+    def get(self, key, version=None):
+        return self.backend.get(self._key(key, version))
+
+    def set(self, key, value, version=None):
+        """Cache a value; pass the ``version()`` read before loading it so a
+        value loaded across an ``invalidate()`` lands under the old version"""
+        self.backend.set(self._key(key, version), value, self.ttl)
+    
+    def delete(self, key):
+        self.backend.delete(self._key(key))
+
+    def get_or_load(self, key, loader):
+        """Return the cached value, calling loader() and caching it on a miss"""
+        full_key = self._key(key)
+        value = self.backend.get(full_key)
+        if value is None:
+            value = loader()
+            if value is not None:
+                self.backend.set(full_key, value, self.ttl)
+        return value
+
+    def invalidate(self):
+        """Drop every key in the namespace"""
+        return self.backend.incr(f"{self.name}:version")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event()}
+
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
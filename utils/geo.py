@@ -0,0 +1,83 @@
+import copy
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959
+METERS_PER_MILE = 1609.344
+
+
+def haversine_miles(lat, lng, lats, lngs):
+    """Distances in miles from (lat, lng) to every point in lats/lngs"""
+    lat1 = np.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=float))
+    delta_lat = lats - lat1
+    delta_lng = np.radians(np.asarray(lngs, dtype=float) - lng)
+
+    a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(delta_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def bounding_box(lat, lng, radius_miles):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing a circle around (lat, lng)"""
+    delta_lat = np.degrees(radius_miles / EARTH_RADIUS_MILES)
+    # Longitude degrees shrink towards the poles
+    cos_lat = max(np.cos(np.radians(lat)), 1e-12)
+    delta_lng = min(np.degrees(radius_miles / (EARTH_RADIUS_MILES * cos_lat)), 180)
+    return lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng
+
+
+class PlaceSet:
+    """A list of places with their coordinates held as NumPy arrays.
+
+    Places use the nearby-places shape (``coordinates: {'lat', 'lng'}``). The
+    arrays are built on construction, so keep the set for data that is queried
+    repeatedly (the mock dataset); each query then costs one vectorized pass.
+    """
+
+    def __init__(self, places):
+        self.places = list(places)
+        self.lats = np.array([place['coordinates']['lat'] for place in self.places], dtype=float)
+        self.lngs = np.array([place['coordinates']['lng'] for place in self.places], dtype=float)
+
+    def __len__(self):
+        return len(self.places)
+
+    def nearby(self, lat, lng, radius_miles=None, limit=None):
+        """Copies of the places within radius_miles of (lat, lng), nearest first.
+
+        Each copy gets ``distance_miles`` and a display ``distance`` string.
+        """
+        if not self.places:
+            return []
+
+        candidates = np.arange(len(self.places))
+        if radius_miles is not None:
+            # Cheap rectangular prefilter before the trigonometry
+            min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_miles)
+            in_box = ((self.lats >= min_lat) & (self.lats <= max_lat) &
+                      (self.lngs >= min_lng) & (self.lngs <= max_lng))
+            candidates = candidates[in_box]
+
+        distances = haversine_miles(lat, lng, self.lats[candidates], self.lngs[candidates])
+        if radius_miles is not None:
+            within = distances <= radius_miles
+            candidates, distances = candidates[within], distances[within]
+
+        order = np.argsort(distances, kind='stable')
+        if limit is not None:
+            order = order[:limit]
+
+        results = []
+        for i in order:
+            place = copy.deepcopy(self.places[candidates[i]])
+            place['distance_miles'] = round(float(distances[i]), 2)
+            place['distance'] = f"{distances[i]:.1f} miles"
+            results.append(place)
+        return results
+
+
+def sort_by_distance(places, lat, lng, radius_miles=None, limit=None):
+    """Places sorted nearest first (optionally within radius_miles), with distances filled in.
+
+    Builds a throwaway PlaceSet, for lists that are only queried once.
+    """
+    return PlaceSet(places).nearby(lat, lng, radius_miles, limit)
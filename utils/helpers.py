@@ -1,11 +1,33 @@
 from functools import wraps
-from flask import session, redirect, url_for, flash
+from flask import session, redirect, url_for, flash, g, jsonify
+from models.user import User
+
+_user_model = None
+
+def current_user():
+    """The logged-in user (without password), loaded at most once per request"""
+    global _user_model
+    if 'current_user' not in g:
+        user = None
+        if 'user_id' in session:
+            if _user_model is None:
+                _user_model = User()
+            user = _user_model.get_principal(session['user_id'])
+            if user and session.get('user_role') != user['role']:
+                # Role changed since login; keep the navigation in step
+                session['user_role'] = user['role']
+        g.current_user = user
+    return g.current_user
+
+def is_admin():
+    user = current_user()
+    return user is not None and user['role'] == 'admin'
 
 def login_required(f):
     """Decorator to require login for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if current_user() is None:
             flash('Please login to access this page', 'error')
             return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
@@ -15,15 +37,26 @@ def admin_required(f):
     """Decorator to require admin role for routes"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if current_user() is None:
             flash('Please login to access this page', 'error')
             return redirect(url_for('auth.login'))
-        if session.get('user_role') != 'admin':
+        if not is_admin():
             flash('Admin access required', 'error')
             return redirect(url_for('main.dashboard'))
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_api_required(f):
+    """Decorator to require admin role for JSON endpoints"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_user() is None:
+            return jsonify({'success': False, 'message': 'Authentication required'})
+        if not is_admin():
+            return jsonify({'success': False, 'message': 'Admin access required'})
+        return f(*args, **kwargs)
+    return decorated_function
+
 def validate_email(email):
     """Basic email validation"""
     import re
@@ -0,0 +1,201 @@
+from collections import deque
+from requests.adapters import HTTPAdapter
+import os
+import random
+import requests
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+
+class UpstreamError(Exception):
+    """Raised when an endpoint answers with a non-200 status"""
+
+    def __init__(self, endpoint, status_code):
+        super().__init__(f"{endpoint} returned HTTP {status_code}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures.
+
+    While open, calls fail immediately. After ``reset_timeout`` seconds one
+    trial call is let through (half-open); success closes the circuit,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class LatencyStats:
+    """Call counters and a window of recent latencies for one endpoint"""
+
+    def __init__(self, window=500):
+        self.calls = 0
+        self.errors = 0
+        self.short_circuited = 0
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms, ok):
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self.samples.append(elapsed_ms)
+
+    def record_short_circuit(self):
+        with self._lock:
+            self.short_circuited += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self.samples)
+            stats = {'calls': self.calls, 'errors': self.errors, 'short_circuited': self.short_circuited}
+        if samples:
+            stats.update({
+                'p50_ms': round(samples[len(samples) // 2], 1),
+                'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1),
+                'max_ms': round(samples[-1], 1)
+            })
+        return stats
+
+
+class HttpClient:
+    """Pooled JSON-over-HTTP client with timeouts, retries and circuit breakers.
+
+    Each named endpoint gets its own breaker and latency stats. Retries cover
+    connection errors, timeouts, 429 and 5xx, with exponential backoff and
+    full jitter.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, connect_timeout=3, read_timeout=10, max_retries=2, backoff=0.2,
+                 pool_size=10, failure_threshold=5, reset_timeout=30):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+
+    @property
+    def session(self):
+        # Sessions hold sockets, so each forked worker builds its own
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def _endpoint(self, endpoint):
+        with self._lock:
+            if endpoint not in self._breakers:
+                self._breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._stats[endpoint] = LatencyStats()
+            return self._breakers[endpoint], self._stats[endpoint]
+
+    def get_json(self, endpoint, url, params=None):
+        """GET url and decode JSON; raises CircuitOpenError, UpstreamError or requests errors"""
+        breaker, stats = self._endpoint(endpoint)
+        if not breaker.allow():
+            stats.record_short_circuit()
+            raise CircuitOpenError(f"Circuit open for {endpoint}")
+
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            response = None
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+                ok = response.status_code == 200
+                stats.record((time.perf_counter() - started) * 1000, ok)
+                if ok:
+                    data = response.json()
+                    breaker.record_success()
+                    return data
+                if response.status_code not in self.RETRY_STATUSES:
+                    # The request itself is wrong; the upstream is healthy
+                    breaker.record_success()
+                    raise UpstreamError(endpoint, response.status_code)
+                error = UpstreamError(endpoint, response.status_code)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                stats.record((time.perf_counter() - started) * 1000, False)
+                error = e
+            except UpstreamError:
+                raise
+            except Exception:
+                # Any other failure (bad encoding, redirect loop, invalid JSON) must
+                # still be recorded, or a half-open trial would never end
+                if response is None:
+                    stats.record((time.perf_counter() - started) * 1000, False)
+                breaker.record_failure()
+                raise
+
+            if attempt >= self.max_retries:
+                breaker.record_failure()
+                raise error
+            attempt += 1
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    def stats(self):
+        """Per-endpoint latency metrics and circuit state"""
+        with self._lock:
+            endpoints = list(self._stats)
+        report = {}
+        for endpoint in endpoints:
+            breaker, stats = self._endpoint(endpoint)
+            report[endpoint] = dict(stats.snapshot(), circuit=breaker.state)
+        return report
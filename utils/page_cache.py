@@ -0,0 +1,66 @@
+from functools import wraps
+from datetime import datetime, timezone
+from flask import request, session, g, make_response, message_flashed
+from config import Config
+from utils.cache import CacheNamespace
+import hashlib
+
+# Rendered HTML of public pages for anonymous visitors
+page_cache = CacheNamespace('pages', ttl=Config.PAGE_CACHE_TTL)
+
+
+def _mark_flashed(app, message, category, **extra):
+    # A page showing a one-off message must not be served to anyone else
+    g.page_uncacheable = True
+
+
+message_flashed.connect(_mark_flashed)
+
+
+def _page_key(stamps, view_args):
+    args = sorted(request.args.items(multi=True))
+    raw = f"{request.endpoint}|{sorted(view_args.items())}|{args}|{stamps}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached_page(*stamp_sources):
+    """Serve a GET page from the render cache for anonymous visitors.
+
+    The key is the endpoint, view args, query args and the values returned
+    by ``stamp_sources`` (data versions from the models), so a data change
+    moves to a fresh key. Logged-in visitors, pending flash messages and
+    non-200 responses always bypass the cache. Cached responses carry an
+    ETag and Last-Modified and answer conditional requests with 304.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not Config.PAGE_CACHE_ENABLED or 'user_id' in session or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            key = _page_key([source() for source in stamp_sources], kwargs)
+            entry = page_cache.get(key)
+            if entry is None:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or g.get('page_uncacheable'):
+                    return response
+                body = response.get_data()
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': hashlib.sha1(body).hexdigest(),
+                    'last_modified': datetime.now(timezone.utc).replace(microsecond=0)
+                }
+                page_cache.set(key, entry)
+            else:
+                response = make_response(entry['body'])
+                response.mimetype = entry['mimetype']
+
+            response.set_etag(entry['etag'])
+            response.last_modified = entry['last_modified']
+            # Browsers must revalidate, since logging in changes the page
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response.make_conditional(request)
+        return decorated_function
+    return decorator